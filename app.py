@@ -1,13 +1,26 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from flask_mail import Mail, Message
-import sqlite3
-from datetime import datetime
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, abort, Response, stream_with_context
 import os
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-import uuid
+from werkzeug.security import check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-import re
+import db
+from db import get_db
+import schema
+import outbox
+import blog
+import search
+import related
+import images
+import uploads
+import inbox
+import export
+from page_cache import PageCache, INDEX_KEY, post_key, slug_key
+from assets import Assets
+from conditional import ConditionalGet
+from freeze import Freezer
+from metrics import Metrics
+from ratelimit import RateLimiter
+from pagination import encode_cursor, seek_clause
 
 # Load environment variables
 try:
@@ -21,8 +34,32 @@ app.config.from_object(Config)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Initialize Flask-Mail
-mail = Mail(app)
+# Behind Apache/Passenger or a load balancer, take the client address from X-Forwarded-For
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+# Flask-Mail is created on first delivery by outbox.get_mail()
+
+# Pooled SQLite connections, released when each app context tears down
+db.init_app(app)
+
+# Rendered public pages, invalidated by the admin post write paths
+page_cache = PageCache(app)
+
+# ETag/Last-Modified validation of public pages, answered before any render
+conditional = ConditionalGet(app)
+
+# Static copies of public pages served by Apache (written by: python run.py freeze)
+freezer = Freezer(app)
+
+# Fingerprinted, precompressed static files (built with: python run.py assets)
+static_assets = Assets(app)
+
+# Per-endpoint latency, SQL and render metrics, scraped from /metrics
+metrics = Metrics(app)
+
+# Per-IP and global token buckets in front of the contact form and admin login
+rate_limiter = RateLimiter(app)
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -34,113 +71,99 @@ def create_upload_folder():
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
 
-def sanitize_filename(filename):
-    """Sanitize filename to prevent security issues"""
-    # Remove any path components
-    filename = os.path.basename(filename)
-    # Replace spaces and special characters
-    filename = re.sub(r'[^a-zA-Z0-9._-]', '_', filename)
-    # Generate unique filename
-    name, ext = os.path.splitext(filename)
-    unique_filename = f"{uuid.uuid4().hex[:8]}_{name}{ext}"
-    return unique_filename
+def static_image_path(image):
+    """Resolve a post's image field to a path under static/, or None for external URLs"""
+    if not image:
+        return 'img/flows.jpg'
+    if image.startswith('http') or '/' in image:
+        return None
+    if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image)):
+        return 'uploads/' + image
+    return 'img/' + image
+
+def save_upload(file):
+    """Store an uploaded image under its content hash and generate its derivatives"""
+    return uploads.store(get_db().cursor(), file, app.config['UPLOAD_FOLDER'], app.static_folder)
+
+@app.template_global()
+def responsive_image(path, alt='', sizes=images.DEFAULT_SIZES, class_='', fallback=None, lazy=True):
+    """Emit a <picture> with WebP/JPEG srcset and sizes for an image under static/"""
+    return images.picture(url_for, get_db().cursor(), path, alt, sizes, class_, fallback, lazy)
+
+def site_version():
+    """Validator for pages that list published posts"""
+    updated_at, count = blog.content_version(get_db().cursor())
+    return (updated_at, count), blog.parse_timestamp(updated_at)
+
+def post_version(post_id=None, slug=None):
+    """Validator for a single published post and the related posts it lists, or None when it does not exist"""
+    c = get_db().cursor()
+    columns = f"id, updated_at, {related.VERSION_COLUMNS}"
+    if post_id is not None:
+        c.execute(f"SELECT {columns} FROM posts WHERE id = ? AND published = 1", (post_id,))
+    else:
+        c.execute(f"SELECT {columns} FROM posts WHERE slug = ? AND published = 1", (slug,))
+    row = c.fetchone()
+    return (row, blog.parse_timestamp(max(row[1] or '', row[3] or ''))) if row else None
+
+def related_pages(c, post_ids):
+    """{post_id: (slug,)} for posts whose related-articles section changed"""
+    return {post_id: (slug,) for post_id, slug, _, _ in blog.fetch_by_ids(c, post_ids)}
+
+def refresh_pages(pages):
+    """Drop the cached and frozen pages of posts after a committed write: {post_id: slugs}"""
+    for post_id, slugs in pages.items():
+        page_cache.invalidate_post(post_id, *slugs)
+    freezer.refresh_posts(pages)
 
 def init_db():
-    conn = sqlite3.connect('akwaflow.db')
-    c = conn.cursor()
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS posts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        content TEXT NOT NULL,
-        category TEXT,
-        image TEXT,
-        date_created DATETIME DEFAULT CURRENT_TIMESTAMP,
-        published BOOLEAN DEFAULT 1
-    )''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS contacts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL,
-        subject TEXT,
-        message TEXT NOT NULL,
-        date_created DATETIME DEFAULT CURRENT_TIMESTAMP,
-        read BOOLEAN DEFAULT 0
-    )''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS admin_users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL
-    )''')
-    
-    # Create default admin user with secure credentials from environment
-    admin_username = os.environ.get('ADMIN_USERNAME', 'akwaflow_admin')
-    admin_password = os.environ.get('ADMIN_PASSWORD', 'AkwaFlow2024!SecurePass')
-    hashed_password = generate_password_hash(admin_password)
-    c.execute("INSERT OR IGNORE INTO admin_users (username, password) VALUES (?, ?)", 
-              (admin_username, hashed_password))
-    
-    # Add sample blog posts if none exist
-    c.execute("SELECT COUNT(*) FROM posts")
-    if c.fetchone()[0] == 0:
-        sample_posts = [
-            (
-                "Flow Meter Calibration: Best Practices for Accurate Measurements",
-                "<p>Flow meter calibration is a critical process in the oil and gas industry, ensuring accurate custody transfer measurements that are essential for revenue assurance and regulatory compliance.</p><p>At AKWAFLOW, we specialize in providing comprehensive calibration services that meet the highest industry standards. Our team of certified technicians uses state-of-the-art equipment and follows internationally recognized procedures to ensure your flow meters operate with maximum precision.</p><h2>Key Benefits</h2><ul><li>Improved measurement accuracy and reliability</li><li>Compliance with NNPC and international standards</li><li>Enhanced revenue assurance through precise custody transfer</li><li>Reduced operational risks and measurement uncertainties</li><li>Comprehensive documentation and certification</li></ul><p>Contact us today to learn more about our flow meter calibration services and how we can help optimize your measurement systems for maximum accuracy and compliance.</p>",
-                "Engineering",
-                "flows.jpg",
-                1
-            ),
-            (
-                "Pipeline Integrity Management: Ensuring Safe Operations",
-                "<p>Pipeline integrity management is crucial for maintaining safe and efficient operations in the oil and gas industry. Our comprehensive approach combines advanced inspection techniques with proactive maintenance strategies.</p><p>We utilize various Non-Destructive Testing (NDT) methods including ultrasonic testing, radiographic testing, magnetic particle inspection, and dye penetrant testing to assess pipeline condition and identify potential issues before they become critical.</p><h2>Our Services Include</h2><ul><li>Comprehensive pipeline inspections</li><li>Risk assessment and management</li><li>Corrosion monitoring and control</li><li>Emergency response planning</li><li>Regulatory compliance support</li></ul><p>Trust AKWAFLOW for reliable pipeline integrity solutions that protect your assets and ensure operational continuity.</p>",
-                "Safety",
-                "ndt.jpg",
-                1
-            ),
-            (
-                "Advanced Corrosion Control Solutions for Critical Infrastructure",
-                "<p>Corrosion is one of the most significant challenges facing the oil and gas industry, causing billions of dollars in damage annually. Our advanced composite wrap technology provides robust and long-lasting protection for critical infrastructure.</p><p>AKWAFLOW's corrosion control solutions combine innovative materials with proven application techniques to deliver superior protection against environmental and operational stresses.</p><h2>Technology Advantages</h2><ul><li>High-strength composite materials</li><li>Rapid installation with minimal downtime</li><li>Long-term durability and reliability</li><li>Cost-effective maintenance solutions</li><li>Environmental compliance</li></ul><p>Protect your infrastructure investment with our proven corrosion control technologies.</p>",
-                "Technical",
-                "corrotion.jpeg",
-                1
-            )
-        ]
-        
-        for title, content, category, image, published in sample_posts:
-            c.execute("INSERT INTO posts (title, content, category, image, published) VALUES (?, ?, ?, ?, ?)",
-                     (title, content, category, image, published))
-    
-    conn.commit()
-    conn.close()
+    """Bring the database schema up to date"""
+    conn = db.connect(app.config['DATABASE'])
+    try:
+        schema.migrate(conn)
+    finally:
+        conn.close()
 
 @app.route('/')
+@conditional.validated(site_version)
+@page_cache.cached(lambda: INDEX_KEY, conditional.current_version)
 def index():
-    conn = sqlite3.connect('akwaflow.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM posts WHERE published = 1 ORDER BY date_created DESC LIMIT 3")
-    posts = c.fetchall()
-    conn.close()
-    return render_template('index.html', posts=posts)
+    # The first page of blog cards is inlined, so the page needs no /api/blogs request to show them;
+    # it is rendered once per content version along with the rest of the cached page
+    posts, next_cursor, has_more = blog_cards(get_db().cursor(), list(BLOG_CARD_FIELDS), BLOG_PAGE_DEFAULT)
+    return render_template('index.html', blog_bootstrap={'posts': posts, 'next_cursor': next_cursor,
+                                                         'has_more': has_more})
 
 @app.route('/blog/<int:post_id>')
-def blog_post(post_id):
-    conn = sqlite3.connect('akwaflow.db')
+@app.route('/blog/<slug>')
+@conditional.validated(post_version)
+@page_cache.cached(lambda post_id=None, slug=None: post_key(post_id) if post_id is not None else slug_key(slug),
+                  conditional.current_version)
+def blog_post(post_id=None, slug=None):
+    conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT * FROM posts WHERE id = ? AND published = 1", (post_id,))
+    columns = "id, title, content, category, image, date_created, excerpt"
+    if post_id is not None:
+        c.execute(f"SELECT {columns} FROM posts WHERE id = ? AND published = 1", (post_id,))
+    else:
+        c.execute(f"SELECT {columns} FROM posts WHERE slug = ? AND published = 1", (slug,))
     post = c.fetchone()
-    conn.close()
     if post:
         post_dict = {
             'id': post[0], 'title': post[1], 'content': post[2],
-            'category': post[3], 'image': post[4], 'date': post[5]
+            'category': post[3], 'image': post[4], 'date': post[5],
+            'description': post[6], 'image_path': static_image_path(post[4])
         }
-        return render_template('blog-post.html', post=post_dict)
+        related_posts = related.fetch(c, post[0])
+        for card in related_posts:
+            card['image_path'] = static_image_path(card['image'])
+        return render_template('blog-post.html', post=post_dict, related_posts=related_posts)
     return redirect(url_for('index'))
 
 @app.route('/contact', methods=['POST'])
+@rate_limiter.limit('RATE_LIMIT_CONTACT', 'RATE_LIMIT_CONTACT_GLOBAL',
+                    lambda retry_after: jsonify({'success': False, 'message':
+                                                 'Too many messages. Please try again in a few minutes.'}))
 def contact():
     if request.method == 'POST':
         name = request.form['name']
@@ -170,33 +193,38 @@ def contact():
         if company:
             enhanced_message += f"\nCompany: {company}"
         
-        conn = sqlite3.connect('akwaflow.db')
+        conn = get_db()
         c = conn.cursor()
-        c.execute("INSERT INTO contacts (name, email, subject, message) VALUES (?, ?, ?, ?)",
-                 (name, email, subject, enhanced_message))
-        conn.commit()
-        conn.close()
-        
-        # Send email notification
-        try:
-            send_contact_email(name, email, subject, enhanced_message, phone, company, service, urgency)
-        except Exception as e:
-            print(f"Email sending failed: {e}")
+        window = app.config['CONTACT_DUPLICATE_WINDOW']
+        fingerprint = inbox.fingerprint(email, subject, enhanced_message)
+        if inbox.record_duplicate(c, fingerprint, window):
+            # A repeat of a recent message: counted on the original, no new row or email
+            conn.commit()
+            metrics.inc('akwaflow_contact_duplicates_total')
+        else:
+            c.execute("INSERT INTO contacts (name, email, subject, message, service, urgency) VALUES (?, ?, ?, ?, ?, ?)",
+                     (name, email, subject, enhanced_message, service or None, urgency or None))
+            inbox.store_fingerprint(c, fingerprint, c.lastrowid, window)
+            # Email notification is delivered by the outbox worker after commit
+            queue_contact_email(c, name, email, subject, enhanced_message, phone, company, service, urgency)
+            conn.commit()
+            outbox.notify()
         
         return jsonify({'success': True, 'message': 'Thank you for your inquiry! We will get back to you soon.'})
     return jsonify({'success': False, 'message': 'Invalid request method'})
 
 @app.route('/admin/login', methods=['GET', 'POST'])
+@rate_limiter.limit('RATE_LIMIT_LOGIN', 'RATE_LIMIT_LOGIN_GLOBAL',
+                    lambda retry_after: f"Too many login attempts. Try again in {retry_after} seconds.")
 def admin_login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
-        conn = sqlite3.connect('akwaflow.db')
+        conn = get_db()
         c = conn.cursor()
         c.execute("SELECT * FROM admin_users WHERE username = ?", (username,))
         user = c.fetchone()
-        conn.close()
         
         if user and check_password_hash(user[2], password):
             session['admin'] = True
@@ -215,13 +243,11 @@ def admin_dashboard():
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("SELECT COUNT(*) FROM posts")
     post_count = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM contacts WHERE read = 0")
-    unread_count = c.fetchone()[0]
-    conn.close()
+    unread_count = inbox.unread_count(c)
     
     return render_template('admin/dashboard.html', post_count=post_count, unread_count=unread_count)
 
@@ -230,13 +256,15 @@ def admin_posts():
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT * FROM posts ORDER BY date_created DESC")
-    posts = c.fetchall()
-    conn.close()
+    try:
+        posts, next_cursor = blog.fetch_admin_page(c, request.args.get('cursor'))
+    except ValueError:
+        # Stale or mangled cursor: start again from the first page
+        return redirect(url_for('admin_posts'))
     
-    return render_template('admin/posts.html', posts=posts)
+    return render_template('admin/posts.html', posts=posts, next_cursor=next_cursor)
 
 @app.route('/admin/posts/new', methods=['GET', 'POST'])
 def admin_new_post():
@@ -253,20 +281,24 @@ def admin_new_post():
         if 'image' in request.files:
             file = request.files['image']
             if file.filename and allowed_file(file.filename):
-                create_upload_folder()
-                filename = sanitize_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                image = filename
+                image = save_upload(file)
             elif file.filename and not allowed_file(file.filename):
                 flash('Invalid file type. Please upload PNG, JPG, JPEG, GIF, or WEBP files only.')
                 return redirect(url_for('admin_new_post'))
         
-        conn = sqlite3.connect('akwaflow.db')
+        conn = get_db()
         c = conn.cursor()
-        c.execute("INSERT INTO posts (title, content, category, image, published) VALUES (?, ?, ?, ?, ?)",
-                 (title, content, category, image, published))
+        derived = blog.derive_fields(c, title, content)
+        c.execute("INSERT INTO posts (title, content, category, image, published, slug, excerpt, word_count, read_time) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 (title, content, category, image, published,
+                  derived['slug'], derived['excerpt'], derived['word_count'], derived['read_time']))
+        post_id = c.lastrowid
+        search.index_post(c, post_id, title, content, category)
+        pages = related_pages(c, related.update_post(c, post_id))
+        uploads.retain(c, app.config['UPLOAD_FOLDER'], image)
         conn.commit()
-        conn.close()
+        refresh_pages({**pages, post_id: (derived['slug'],)})
         
         flash('Post created successfully!')
         return redirect(url_for('admin_posts'))
@@ -278,7 +310,7 @@ def admin_edit_post(post_id):
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    conn = get_db()
     c = conn.cursor()
     
     if request.method == 'POST':
@@ -291,25 +323,35 @@ def admin_edit_post(post_id):
         if 'image' in request.files and request.files['image'].filename:
             file = request.files['image']
             if allowed_file(file.filename):
-                create_upload_folder()
-                filename = sanitize_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                image = filename
+                image = save_upload(file)
             else:
                 flash('Invalid file type. Please upload PNG, JPG, JPEG, GIF, or WEBP files only.')
                 return redirect(url_for('admin_edit_post', post_id=post_id))
         
-        c.execute("UPDATE posts SET title=?, content=?, category=?, image=?, published=? WHERE id=?",
-                 (title, content, category, image, published, post_id))
+        c.execute("SELECT slug, image FROM posts WHERE id = ?", (post_id,))
+        row = c.fetchone()
+        old_slug, old_image = row if row else (None, None)
+        
+        derived = blog.derive_fields(c, title, content, post_id)
+        c.execute("UPDATE posts SET title=?, content=?, category=?, image=?, published=?, "
+                  "slug=?, excerpt=?, word_count=?, read_time=? WHERE id=?",
+                 (title, content, category, image, published,
+                  derived['slug'], derived['excerpt'], derived['word_count'], derived['read_time'], post_id))
+        search.index_post(c, post_id, title, content, category)
+        pages = related_pages(c, related.update_post(c, post_id))
+        if image != old_image:
+            uploads.release(c, old_image)
+            uploads.retain(c, app.config['UPLOAD_FOLDER'], image)
         conn.commit()
-        conn.close()
+        refresh_pages({**pages, post_id: (old_slug, derived['slug'])})
+        if image != old_image:
+            uploads.collect(conn, app.config['UPLOAD_FOLDER'], app.static_folder, [old_image])
         
         flash('Post updated successfully!')
         return redirect(url_for('admin_posts'))
     
     c.execute("SELECT * FROM posts WHERE id = ?", (post_id,))
     post = c.fetchone()
-    conn.close()
     
     if post:
         post_dict = {
@@ -325,38 +367,120 @@ def admin_delete_post(post_id):
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    conn = get_db()
     c = conn.cursor()
+    c.execute("SELECT slug, image FROM posts WHERE id = ?", (post_id,))
+    slug, image = c.fetchone() or (None, None)
     c.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+    search.remove_post(c, post_id)
+    pages = related_pages(c, related.remove_post(c, post_id))
+    uploads.release(c, image)
     conn.commit()
-    conn.close()
+    refresh_pages({**pages, post_id: (slug,)})
+    uploads.collect(conn, app.config['UPLOAD_FOLDER'], app.static_folder, [image])
     
     flash('Post deleted successfully!')
     return redirect(url_for('admin_posts'))
 
+@app.route('/admin/posts/bulk', methods=['POST'])
+def admin_bulk_posts():
+    if not session.get('admin'):
+        return redirect(url_for('admin_login'))
+    
+    action = request.form.get('action')
+    ids = request.form.getlist('ids', type=int)
+    if action not in ('publish', 'unpublish', 'delete') or not ids:
+        flash('Select at least one post and an action.')
+        return redirect(url_for('admin_posts'))
+    
+    conn = get_db()
+    c = conn.cursor()
+    released_images = []
+    if action == 'delete':
+        rows = blog.fetch_by_ids(c, ids)
+        changed = [(post_id, slug) for post_id, slug, _, _ in rows]
+        c.executemany("DELETE FROM posts WHERE id = ?", [(post_id,) for post_id, _ in changed])
+        search.remove_posts(c, [post_id for post_id, _ in changed])
+        for row in rows:
+            uploads.release(c, row[3])
+            released_images.append(row[3])
+    else:
+        changed = blog.set_published(c, ids, action == 'publish')
+    # update_post() drops posts that are gone or unpublished
+    neighbours = set()
+    for post_id, _ in changed:
+        neighbours |= related.update_post(c, post_id)
+    pages = related_pages(c, neighbours)
+    conn.commit()
+    refresh_pages({**pages, **{post_id: (slug,) for post_id, slug in changed}})
+    if released_images:
+        uploads.collect(conn, app.config['UPLOAD_FOLDER'], app.static_folder, released_images)
+    
+    verb = {'publish': 'published', 'unpublish': 'unpublished', 'delete': 'deleted'}[action]
+    flash(f"{len(changed)} post{'s' if len(changed) != 1 else ''} {verb}.")
+    return redirect(url_for('admin_posts'))
+
 @app.route('/admin/contacts')
 def admin_contacts():
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    try:
+        filters = inbox.parse_filters(request.args)
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.')
+        return redirect(url_for('admin_contacts'))
+    
+    conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT * FROM contacts ORDER BY date_created DESC")
-    contacts = c.fetchall()
-    conn.close()
+    try:
+        contacts, next_cursor = inbox.fetch_page(c, filters, request.args.get('cursor'))
+    except ValueError:
+        # Stale or mangled cursor: start again from the first page
+        args = request.args.to_dict()
+        args.pop('cursor', None)
+        return redirect(url_for('admin_contacts', **args))
+    
+    return render_template('admin/contacts.html', contacts=contacts, filters=filters,
+                           next_cursor=next_cursor, unread_count=inbox.unread_count(c),
+                           services=inbox.service_options(c))
+
+def export_response(table, fmt, filters=None):
+    """Stream a table export as a file download"""
+    if fmt not in export.FORMATS:
+        abort(400)
+    response = Response(stream_with_context(export.stream(get_db(), table, fmt, filters)),
+                        mimetype=export.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{export.filename(table, fmt)}"'
+    return response
+
+@app.route('/admin/contacts/export')
+def admin_export_contacts():
+    if not session.get('admin'):
+        return redirect(url_for('admin_login'))
     
-    return render_template('admin/contacts.html', contacts=contacts)
+    try:
+        filters = inbox.parse_filters(request.args)
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.')
+        return redirect(url_for('admin_contacts'))
+    return export_response('contacts', request.args.get('format', 'csv'), filters)
+
+@app.route('/admin/posts/export')
+def admin_export_posts():
+    if not session.get('admin'):
+        return redirect(url_for('admin_login'))
+    return export_response('posts', request.args.get('format', 'csv'))
 
 @app.route('/admin/contacts/read/<int:contact_id>')
 def admin_mark_read(contact_id):
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("UPDATE contacts SET read = 1 WHERE id = ?", (contact_id,))
     conn.commit()
-    conn.close()
     
     return redirect(url_for('admin_contacts'))
 
@@ -365,86 +489,217 @@ def admin_delete_contact(contact_id):
     if not session.get('admin'):
         return redirect(url_for('admin_login'))
     
-    conn = sqlite3.connect('akwaflow.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("DELETE FROM contacts WHERE id = ?", (contact_id,))
     conn.commit()
-    conn.close()
     
     flash('Contact deleted successfully!')
     return redirect(url_for('admin_contacts'))
 
+@app.route('/admin/contacts/bulk', methods=['POST'])
+def admin_bulk_contacts():
+    if not session.get('admin'):
+        return redirect(url_for('admin_login'))
+    
+    # The form carries the inbox filters it was shown with, to return to them
+    args = {key: value for key, value in request.form.items()
+            if key not in ('action', 'scope', 'ids', 'cursor') and value}
+    action = request.form.get('action')
+    if action not in inbox.BULK_ACTIONS:
+        flash('Choose an action.')
+        return redirect(url_for('admin_contacts', **args))
+    
+    ids, filters = None, None
+    if request.form.get('scope') == 'matching':
+        try:
+            filters = inbox.parse_filters(request.form)
+        except ValueError:
+            flash('Dates must be in YYYY-MM-DD format.')
+            return redirect(url_for('admin_contacts'))
+        if action == 'delete' and not any(filters.values()):
+            flash('Set a filter before deleting all matching messages.')
+            return redirect(url_for('admin_contacts', **args))
+    else:
+        ids = request.form.getlist('ids', type=int)
+        if not ids:
+            flash('Select at least one message.')
+            return redirect(url_for('admin_contacts', **args))
+    
+    conn = get_db()
+    c = conn.cursor()
+    count = inbox.bulk_apply(c, action, ids, filters)
+    conn.commit()
+    
+    verb = {'read': 'marked read', 'unread': 'marked unread', 'delete': 'deleted'}[action]
+    flash(f"{count} message{'s' if count != 1 else ''} {verb}.")
+    return redirect(url_for('admin_contacts', **args))
+
+# Card fields /api/blogs can return, and the columns each one needs
+BLOG_CARD_FIELDS = {
+    'id': ('id',),
+    'slug': ('slug',),
+    'title': ('title',),
+    'description': ('excerpt',),
+    'category': ('category',),
+    'image': ('image',),
+    'date': ('date_created',),
+    'read_time': ('read_time',),
+}
+BLOG_PAGE_DEFAULT = 6
+BLOG_PAGE_MAX = 50
+SEARCH_PAGE_DEFAULT = 10
+SEARCH_PAGE_MAX = 50
+
+def blog_cards(c, fields, limit, category=None, after=None):
+    """Return (cards, next_cursor, has_more) for a page of published posts, newest first
+    
+    after is the next_cursor of the previous page; a mangled one raises ValueError.
+    """
+    # Only read the columns the requested fields need; the keyset columns are always read
+    columns = ['id', 'date_created']
+    for field in fields:
+        columns.extend(col for col in BLOG_CARD_FIELDS[field] if col not in columns)
+    
+    where = ["published = 1"]
+    params = []
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    if after:
+        clause, seek_params = seek_clause(after)
+        where.append(clause)
+        params.extend(seek_params)
+    
+    c.execute(f"SELECT {', '.join(columns)} FROM posts WHERE {' AND '.join(where)} "
+              "ORDER BY date_created DESC, id DESC LIMIT ?", params + [limit + 1])
+    rows = c.fetchall()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    posts = []
+    for row in rows:
+        post = dict(zip(columns, row))
+        card = {}
+        for field in fields:
+            if field == 'id':
+                card['id'] = post['id']
+            elif field == 'slug':
+                card['slug'] = post['slug']
+            elif field == 'title':
+                card['title'] = post['title']
+            elif field == 'description':
+                card['description'] = post['excerpt'] or ''
+            elif field == 'category':
+                card['category'] = post['category'] or 'General'
+            elif field == 'image':
+                card['image'] = post['image'] or 'flows.jpg'
+            elif field == 'date':
+                card['date'] = post['date_created'][:10] if post['date_created'] else '2024-01-01'
+            elif field == 'read_time':
+                card['read_time'] = blog.format_read_time(post['read_time'])
+        posts.append(card)
+    
+    next_cursor = encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None
+    return posts, next_cursor, has_more
+
 @app.route('/api/blogs')
+@conditional.validated(site_version)
 def api_blogs():
-    """API endpoint to get blog posts for frontend"""
-    conn = sqlite3.connect('akwaflow.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM posts WHERE published = 1 ORDER BY date_created DESC")
-    posts = c.fetchall()
-    conn.close()
-    
-    blog_data = {}
-    for post in posts:
-        slug = post[1].lower().replace(' ', '-').replace(',', '').replace('.', '').replace('(', '').replace(')', '')
-        # Clean description from HTML tags for preview
-        description = post[2].replace('<p>', '').replace('</p>', '').replace('<br>', ' ')
-        description = description[:150] + '...' if len(description) > 150 else description
-        
-        blog_data[slug] = {
-            'id': post[0],
-            'title': post[1],
-            'description': description,
-            'category': post[3] or 'General',
-            'image': post[4] or 'flows.jpg',
-            'date': post[5][:10] if post[5] else '2024-01-01',
-            'read_time': calculate_read_time(post[2])
-        }
+    """API endpoint to get a page of blog post cards for the frontend
+    
+    Query parameters: limit, category, fields (comma-separated) and cursor
+    (the next_cursor of the previous page). Pages are ordered newest first
+    and seek on (date_created, id), so every page costs the same. Card text
+    comes from the precomputed columns, never from the content column.
+    Responses carry an ETag, and unchanged pages revalidate with a 304.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', BLOG_PAGE_DEFAULT)), 1), BLOG_PAGE_MAX)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(BLOG_CARD_FIELDS)
+    unknown = [f for f in fields if f not in BLOG_CARD_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
     
-    return jsonify(blog_data)
+    try:
+        posts, next_cursor, has_more = blog_cards(get_db().cursor(), fields, limit, request.args.get('category'),
+                                                  request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    return jsonify({'posts': posts, 'next_cursor': next_cursor, 'has_more': has_more})
 
-def calculate_read_time(content):
-    """Calculate estimated reading time based on content length"""
-    words = len(content.split())
-    minutes = max(1, round(words / 200))  # Average reading speed: 200 words per minute
-    return f"{minutes} min read"
+def queue_contact_email(cursor, name, email, subject, message, phone=None, company=None, service=None, urgency=None):
+    """Queue the admin notification for a contact form submission"""
+    email_subject = f"New Contact Form Submission: {subject or 'General Inquiry'}"
+    
+    # Create email body
+    email_body = f"""
+    New contact form submission from AKWAFLOW website:
+    
+    Name: {name}
+    Email: {email}
+    Phone: {phone or 'Not provided'}
+    Company: {company or 'Not provided'}
+    Service Interest: {service or 'Not specified'}
+    Timeline: {urgency or 'Not specified'}
+    
+    Subject: {subject or 'General Inquiry'}
+    
+    Message:
+    {message}
+    
+    ---
+    This email was sent automatically from the AKWAFLOW contact form.
+    Please reply directly to {email} to respond to this inquiry.
+    """
+    
+    return outbox.enqueue(cursor, app.config['ADMIN_EMAIL'], email_subject, email_body, reply_to=email)
 
-def send_contact_email(name, email, subject, message, phone=None, company=None, service=None, urgency=None):
-    """Send email notification when contact form is submitted"""
+@app.route('/api/search')
+def api_search():
+    """API endpoint for full-text search over published posts
+    
+    Query parameters: q, limit, page and category. Results are ranked by
+    BM25 and carry <mark>-highlighted titles and snippets.
+    """
+    query = request.args.get('q', '').strip()
     try:
-        msg = Message(
-            subject=f"New Contact Form Submission: {subject or 'General Inquiry'}",
-            sender=app.config['MAIL_DEFAULT_SENDER'],
-            recipients=[app.config['ADMIN_EMAIL']]
-        )
-        
-        # Create email body
-        email_body = f"""
-        New contact form submission from AKWAFLOW website:
-        
-        Name: {name}
-        Email: {email}
-        Phone: {phone or 'Not provided'}
-        Company: {company or 'Not provided'}
-        Service Interest: {service or 'Not specified'}
-        Timeline: {urgency or 'Not specified'}
-        
-        Subject: {subject or 'General Inquiry'}
-        
-        Message:
-        {message}
-        
-        ---
-        This email was sent automatically from the AKWAFLOW contact form.
-        Please reply directly to {email} to respond to this inquiry.
-        """
-        
-        msg.body = email_body
-        mail.send(msg)
-        print(f"Email sent successfully to {app.config['ADMIN_EMAIL']}")
-        
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        raise e
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_DEFAULT)), 1), SEARCH_PAGE_MAX)
+        page = max(int(request.args.get('page', 1)), 1)
+    except ValueError:
+        return jsonify({'error': 'limit and page must be integers'}), 400
+    
+    conn = get_db()
+    c = conn.cursor()
+    results, has_more = search.search_posts(c, query, limit=limit, offset=(page - 1) * limit,
+                                            category=request.args.get('category'))
+    return jsonify({'query': query, 'results': results, 'page': page, 'has_more': has_more})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not (session.get('admin') or metrics.authorized(request)):
+        abort(403)
+    c = get_db().cursor()
+    c.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+    gauges = [('akwaflow_outbox_messages', {'status': status}, count) for status, count in c.fetchall()]
+    gauges.append(('akwaflow_unread_contacts', None, inbox.unread_count(c)))
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.after_request
+def immutable_upload_headers(response):
+    """Content-addressed uploads never change, so browsers and CDNs may keep them forever"""
+    if request.endpoint == 'static' and uploads.HASHED_NAME.match((request.view_args or {}).get('filename', '')):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
 
 @app.errorhandler(404)
 def not_found_error(error):
@@ -459,9 +714,15 @@ def too_large(error):
     flash('File too large. Maximum size is 16MB.')
     return redirect(request.url)
 
-# Initialize database and upload folder on startup
-init_db()
-create_upload_folder()
+def bootstrap():
+    """Create or upgrade the database and the upload folder (safe to run repeatedly)"""
+    init_db()
+    create_upload_folder()
+
+# Importing the app only costs a user_version read; a database that is missing
+# or behind is migrated here so a worker never serves an old schema
+if not schema.is_current(app.config['DATABASE']):
+    init_db()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,141 @@
+"""
+Static asset fingerprinting for the AKWAFLOW website
+
+build() copies every file under static/ to static/dist/ with a content hash
+in its name, writes gzip and brotli siblings for text assets and records
+the mapping in static/dist/manifest.json. Once built, url_for('static', ...)
+emits the fingerprinted names. Those names are served with year-long
+immutable cache headers, using the precompressed variant the client accepts.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Brotli not installed, only .gz variants are written
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+ONE_YEAR = 31536000
+
+# Generated or per-upload content that is never fingerprinted
+SKIP_DIRS = {DIST_DIR, 'uploads', 'derived'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.map'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprinted_name(path, digest):
+    stem, ext = os.path.splitext(path)
+    return f"{DIST_DIR}/{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _compress(source, data):
+    with open(source + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(source + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build(static_folder, clean=False):
+    """Fingerprint and precompress static assets, returning the manifest"""
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root == '.':
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            rel_path = name if rel_root == '.' else f"{rel_root}/{name}".replace(os.sep, '/')
+            with open(os.path.join(root, name), 'rb') as f:
+                data = f.read()
+            target = fingerprinted_name(rel_path, hashlib.sha256(data).hexdigest())
+            manifest[rel_path] = target
+
+            dest = os.path.join(static_folder, target)
+            if os.path.exists(dest):
+                continue  # Unchanged since the last build
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(os.path.join(root, name), dest)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                _compress(dest, data)
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    tmp = os.path.join(dist, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(dist, MANIFEST))
+
+    if clean:
+        _remove_stale(dist, static_folder, set(manifest.values()))
+    return manifest
+
+
+def _remove_stale(dist, static_folder, current):
+    """Delete fingerprinted files from earlier builds"""
+    for root, _, files in os.walk(dist):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+            base = path[:-3] if path.endswith(('.gz', '.br')) else path
+            if name != MANIFEST and base not in current:
+                os.remove(os.path.join(root, name))
+
+
+class Assets:
+    """Serve fingerprinted, precompressed static files through url_for('static')"""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.load()
+        app.url_defaults(self.fingerprint_url)
+        app.view_functions['static'] = self.send_static
+        app.extensions['assets'] = self
+
+    def load(self):
+        """Read the manifest written by build(), if there is one"""
+        try:
+            with open(os.path.join(self.static_folder, DIST_DIR, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def fingerprint_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest.get(values['filename'], values['filename'])
+
+    def send_static(self, filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return send_from_directory(self.static_folder, filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.exists(os.path.join(self.static_folder, filename + suffix)):
+                response = send_from_directory(self.static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        if response is None:
+            response = send_from_directory(self.static_folder, filename, mimetype=mimetype)
+
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+        return response
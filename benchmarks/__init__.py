@@ -0,0 +1,12 @@
+"""
+HTTP benchmark suite for the AKWAFLOW website
+
+Drives the public and admin routes against a generated dataset, either
+in-process through Flask's test client or over HTTP against a locally
+started gunicorn, and reports latency percentiles, throughput and SQL
+statements per request. Everything runs offline: a local SMTP sink stands
+in for the mail server.
+
+    python -m benchmarks run --posts 2000 --concurrency 8 --output results.json
+    python -m benchmarks compare baseline.json results.json --threshold 10
+"""
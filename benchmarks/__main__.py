@@ -0,0 +1,171 @@
+"""
+Command line entry point: python -m benchmarks run|compare
+"""
+
+import argparse
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import dataset, report, runner
+from benchmarks.smtp_sink import SMTPSink
+
+ADMIN_USERNAME = 'bench_admin'
+ADMIN_PASSWORD = 'bench-password'
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=runner.ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_env(database, smtp_port, page_cache):
+    """Environment for the app under test: private database, local SMTP, SQL counting"""
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_PATH': database,
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(smtp_port),
+        'MAIL_USE_TLS': 'False',
+        'MAIL_USE_SSL': 'False',
+        'MAIL_USERNAME': '',
+        'MAIL_PASSWORD': '',
+        'MAIL_DEFAULT_SENDER': 'benchmark@localhost',
+        'ADMIN_EMAIL': 'admin@localhost',
+        'ADMIN_USERNAME': ADMIN_USERNAME,
+        'ADMIN_PASSWORD': ADMIN_PASSWORD,
+        'DB_COUNT_QUERIES': 'True',
+        'PAGE_CACHE_ENABLED': 'True' if page_cache else 'False',
+        'PAGE_CACHE_DIR': '',
+        'OUTBOX_WORKER': 'True',
+        'WEB_PIDFILE': '',
+        'RATE_LIMIT_ENABLED': 'False',  # every simulated client shares one address
+        'WEB_ACCESS_LOG': '',
+    })
+    return env
+
+
+def run(args):
+    routes = args.routes.split(',') if args.routes else None
+    workdir = tempfile.mkdtemp(prefix='akwaflow-bench-')
+    database = os.path.join(workdir, 'bench.db')
+    sink = SMTPSink().start()
+    env = benchmark_env(database, sink.port, not args.no_page_cache)
+    os.environ.update(env)  # the seed migration and an in-process app read these
+    server = None
+    try:
+        print(f"Generating {args.posts} posts and {args.contacts} contacts...")
+        slugs = dataset.build(database, args.posts, args.contacts, args.seed)
+        available = runner.targets(slugs)
+        selected = [available[name] for name in (routes or available)]
+
+        if args.mode == 'gunicorn':
+            port = runner.free_port()
+            server = runner.start_gunicorn(port, args.workers, args.threads, env)
+            driver = runner.HTTPDriver('127.0.0.1', port, ADMIN_USERNAME, ADMIN_PASSWORD)
+        else:
+            from app import app
+            import outbox
+            outbox.start_worker(app)
+            driver = runner.ClientDriver(app)
+
+        results = {
+            'meta': {
+                'mode': args.mode,
+                'concurrency': args.concurrency,
+                'requests_per_route': args.requests,
+                'posts': args.posts,
+                'contacts': args.contacts,
+                'seed': args.seed,
+                'page_cache': not args.no_page_cache,
+                'workers': args.workers if args.mode == 'gunicorn' else None,
+                'threads': args.threads if args.mode == 'gunicorn' else None,
+                'python': platform.python_version(),
+                'revision': git_revision(),
+                'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            },
+            'routes': {},
+        }
+        for target in selected:
+            samples, elapsed = runner.run_target(driver, target, args.requests, args.concurrency,
+                                                 args.warmup, args.seed)
+            results['routes'][target.name] = report.summarize(samples, elapsed)
+
+        # Give the outbox a moment to hand the contact emails to the sink
+        deadline = time.time() + 5
+        while 'contact' in results['routes'] and sink.messages < args.requests and time.time() < deadline:
+            time.sleep(0.1)
+        results['meta']['emails_delivered'] = sink.messages
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        sink.stop()
+        if args.keep:
+            print(f"Benchmark database kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report.print_results(results)
+    if args.output:
+        report.save(results, args.output)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        return check(report.load(args.baseline), results, args.threshold)
+    return 0
+
+
+def check(baseline, current, threshold_percent):
+    report.print_comparison(baseline, current)
+    regressions = report.compare(baseline, current, threshold_percent / 100)
+    if not regressions:
+        print(f"No regressions beyond {threshold_percent}%.")
+        return 0
+    print("Regressions:")
+    for name, metric, old, new, change in regressions:
+        print(f"- {name} {metric}: {old} -> {new} ({change:+.1%})")
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='benchmark the routes and report latency')
+    run_parser.add_argument('--mode', choices=('client', 'gunicorn'), default='client')
+    run_parser.add_argument('--posts', type=int, default=200, help='generated posts')
+    run_parser.add_argument('--contacts', type=int, default=500, help='generated contact messages')
+    run_parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    run_parser.add_argument('--concurrency', type=int, default=4, help='client threads')
+    run_parser.add_argument('--warmup', type=int, default=10, help='untimed requests per route')
+    run_parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    run_parser.add_argument('--threads', type=int, default=1, help='threads per gunicorn worker')
+    run_parser.add_argument('--routes', help='comma-separated subset of routes to run')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--no-page-cache', action='store_true', help='disable the rendered-page cache')
+    run_parser.add_argument('--output', help='write results as JSON')
+    run_parser.add_argument('--baseline', help='compare against a saved results file')
+    run_parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+    run_parser.add_argument('--keep', action='store_true', help='keep the generated database')
+
+    compare_parser = commands.add_parser('compare', help='diff two results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        return check(report.load(args.baseline), report.load(args.current), args.threshold)
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""
+Reproducible benchmark database: N posts and M contacts from a fixed seed
+"""
+
+import datagen
+import db
+import related
+import schema
+import search
+
+
+def build(path, posts=200, contacts=500, seed=1):
+    """Create a migrated database at path filled with generated rows, returning the published slugs"""
+    conn = db.connect(path)
+    schema.migrate(conn, verbose=False)
+    datagen.generate(conn, posts, contacts, seed=seed, verbose=False)
+    # Merge the bulk-loaded index segments as a deployed site would have
+    search.rebuild(conn)
+    # Bulk loads skip the related-posts index, which blog pages read
+    related.rebuild(conn)
+    c = conn.cursor()
+    c.execute("SELECT slug FROM posts WHERE published = 1 ORDER BY id")
+    slugs = [row[0] for row in c.fetchall()]
+    conn.close()
+    return slugs
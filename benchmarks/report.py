@@ -0,0 +1,87 @@
+"""
+Result summaries, JSON output and baseline comparison
+"""
+
+import json
+import math
+
+# Metric -> True when larger is better
+METRICS = {
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'throughput_rps': True,
+    'sql_per_request': False,
+}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, status, _ in samples if 0 < status < 400)
+    sql = [count for _, status, count in samples if 0 < status < 400]
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'sql_per_request': round(sum(sql) / len(sql), 2) if sql else 0.0,
+        'sql_max': max(sql, default=0),
+    }
+
+
+def print_results(results):
+    print(f"{'route':<18}{'reqs':>6}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'sql':>7}")
+    for name, r in results['routes'].items():
+        print(f"{name:<18}{r['requests']:>6}{r['errors']:>6}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['throughput_rps']:>10.1f}{r['sql_per_request']:>7.1f}")
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return [(route, metric, baseline, current, change)] for metrics worse than threshold"""
+    regressions = []
+    for name, now in current['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric, 0), now.get(metric, 0)
+            if higher_is_better:
+                worse = new < old * (1 - threshold)
+            else:
+                worse = new > old * (1 + threshold)
+            if worse:
+                change = (new - old) / old if old else float('inf')
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def print_comparison(baseline, current):
+    print(f"{'route':<18}{'metric':<17}{'baseline':>11}{'current':>11}{'change':>9}")
+    for name, now in current['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            print(f"{name:<18}(not in baseline)")
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric, 0), now.get(metric, 0)
+            change = f"{(new - old) / old:+.1%}" if old else 'n/a'
+            print(f"{name:<18}{metric:<17}{old:>11.2f}{new:>11.2f}{change:>9}")
@@ -0,0 +1,173 @@
+"""
+Request drivers and the timed load loop
+"""
+
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from datagen import SERVICES, URGENCIES, WORDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Target:
+    """One benchmarked route: build(rng) returns (path, form data or None)"""
+
+    def __init__(self, name, method, build, admin=False):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.admin = admin
+
+
+def targets(slugs):
+    """The routes covered by a run, keyed by name"""
+    def contact_form(rng):
+        return '/contact', {
+            'name': 'Benchmark Client', 'email': f"bench{rng.randint(1, 50)}@example.com",
+            'subject': 'Benchmark enquiry', 'message': ' '.join(rng.choice(WORDS) for _ in range(40)),
+            'service': rng.choice(SERVICES), 'urgency': rng.choice(URGENCIES),
+        }
+
+    found = [
+        Target('index', 'GET', lambda rng: ('/', None)),
+        Target('blog_post', 'GET', lambda rng: (f"/blog/{rng.choice(slugs)}", None)),
+        Target('api_blogs', 'GET', lambda rng: ('/api/blogs?limit=12', None)),
+        Target('api_search', 'GET', lambda rng: (f"/api/search?q={rng.choice(WORDS)}", None)),
+        Target('contact', 'POST', contact_form),
+        Target('admin_dashboard', 'GET', lambda rng: ('/admin', None), admin=True),
+        Target('admin_posts', 'GET', lambda rng: ('/admin/posts', None), admin=True),
+        Target('admin_contacts', 'GET', lambda rng: ('/admin/contacts', None), admin=True),
+    ]
+    return {t.name: t for t in found}
+
+
+class ClientDriver:
+    """Requests through Flask's test client, in this process"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self, admin):
+        client = self.app.test_client()
+        if admin:
+            with client.session_transaction() as sess:
+                sess['admin'] = True
+        return _ClientSession(client)
+
+
+class _ClientSession:
+
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, path, form=None):
+        response = self.client.open(path, method=method, data=form)
+        response.get_data()
+        response.close()
+        return response.status_code, int(response.headers.get('X-SQL-Queries', 0))
+
+
+class HTTPDriver:
+    """Requests over HTTP to a running server, one connection per thread"""
+
+    def __init__(self, host, port, username, password):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+
+    def session(self, admin):
+        session = _HTTPSession(self.host, self.port)
+        if admin:
+            session.request('POST', '/admin/login', {'username': self.username, 'password': self.password})
+            if not session.cookie:
+                raise RuntimeError("Admin login failed; check ADMIN_USERNAME/ADMIN_PASSWORD")
+        return session
+
+
+class _HTTPSession:
+
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # The server closed a kept-alive connection; retry once on a fresh one
+            self.conn.close()
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie and cookie.startswith('session='):
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, int(response.getheader('X-SQL-Queries') or 0)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(port, workers, threads, env, timeout=30):
+    """Start gunicorn serving app:app on 127.0.0.1:port and wait until it accepts"""
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+               '--bind', f"127.0.0.1:{port}", '--log-level', 'warning', 'app:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start listening within {timeout}s")
+
+
+def run_target(driver, target, requests, concurrency, warmup=10, seed=1):
+    """Send requests to one target; returns ([(seconds, status, sql)], wall seconds)"""
+    def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        session = driver.session(target.admin)
+        samples = []
+        for _ in range(count):
+            path, form = target.build(rng)
+            started = time.perf_counter()
+            try:
+                status, sql = session.request(target.method, path, form)
+            except (http.client.HTTPException, OSError):
+                status, sql = 0, 0
+            samples.append((time.perf_counter() - started, status, sql))
+        return samples
+
+    if warmup:
+        worker(-1, warmup)
+
+    counts = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        batches = list(pool.map(worker, range(concurrency), counts))
+    elapsed = time.perf_counter() - started
+    return [sample for batch in batches for sample in batch], elapsed
@@ -0,0 +1,64 @@
+"""
+Minimal local SMTP server that accepts and discards every message
+"""
+
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost benchmark SMTP sink')
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b'\r\n')
+            if in_data:
+                if line == b'.':
+                    in_data = False
+                    self.server.received()
+                    self.reply('250 OK')
+                continue
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250 localhost')
+            elif command == b'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET and NOOP all succeed
+                self.reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Counts delivered messages; start() serves on a free local port"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def received(self):
+        with self._lock:
+            self.messages += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
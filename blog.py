@@ -0,0 +1,200 @@
+"""
+Blog post helpers for the AKWAFLOW website
+
+Derived fields (slug, excerpt, word count and read time) are computed once
+when a post is saved and stored alongside it, so listings never have to
+load or parse the HTML content column.
+"""
+
+import re
+import unicodedata
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+
+from pagination import encode_cursor, seek_clause
+
+EXCERPT_LENGTH = 150
+WORDS_PER_MINUTE = 200  # Average reading speed
+SLUG_MAX_LENGTH = 80
+ADMIN_PAGE_SIZE = 50
+
+# Columns the admin post list shows, in template order
+ADMIN_COLUMNS = "id, title, category, date_created, published"
+
+PUBLISHED_COUNTER = 'published_posts'
+# Elements whose boundaries separate words in the rendered text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul',
+}
+SKIP_TAGS = {'script', 'style', 'template'}
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the visible text of an HTML fragment"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def strip_html(content):
+    """Return the plain text of an HTML fragment with whitespace collapsed"""
+    parser = _TextExtractor()
+    parser.feed(content or '')
+    parser.close()
+    return ' '.join(''.join(parser.parts).split())
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Cut plain text to a preview, breaking on a word boundary"""
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' ,.;:') + '...'
+
+
+def slugify(title):
+    """Turn a title into a URL slug"""
+    slug = unicodedata.normalize('NFKD', title or '').encode('ascii', 'ignore').decode()
+    slug = re.sub(r'[^a-z0-9]+', '-', slug.lower()).strip('-')
+    return slug[:SLUG_MAX_LENGTH].rstrip('-') or 'post'
+
+
+def unique_slug(cursor, title, post_id=None):
+    """Return a slug for the title that no other post is using"""
+    base = slugify(title)
+    slug = base
+    suffix = 2
+    while True:
+        cursor.execute("SELECT 1 FROM posts WHERE slug = ? AND id IS NOT ?", (slug, post_id))
+        if cursor.fetchone() is None:
+            return slug
+        slug = f"{base}-{suffix}"
+        suffix += 1
+
+
+def derive_fields(cursor, title, content, post_id=None):
+    """Compute the stored derived columns for a post"""
+    text = strip_html(content)
+    word_count = len(text.split())
+    return {
+        'slug': unique_slug(cursor, title, post_id),
+        'excerpt': make_excerpt(text),
+        'word_count': word_count,
+        'read_time': max(1, round(word_count / WORDS_PER_MINUTE)),
+    }
+
+
+def format_read_time(minutes):
+    """Format a stored read time for display"""
+    return f"{minutes or 1} min read"
+
+
+def recount_published(cursor):
+    """Reset the published counter from the table (after bulk loads or manual edits)"""
+    cursor.execute("UPDATE counters SET value = (SELECT COUNT(*) FROM posts WHERE published = 1) WHERE name = ?",
+                   (PUBLISHED_COUNTER,))
+
+
+def content_version(cursor):
+    """Return (latest updated_at, count) over published posts; changes whenever public content does
+
+    Two index lookups, whatever the size of the table.
+    """
+    cursor.execute("SELECT (SELECT MAX(updated_at) FROM posts WHERE published = 1), "
+                   "(SELECT value FROM counters WHERE name = ?)", (PUBLISHED_COUNTER,))
+    return cursor.fetchone()
+
+
+def parse_timestamp(value):
+    """Read a stored SQLite timestamp as an aware UTC datetime, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def fetch_by_ids(cursor, post_ids, columns="id, slug, published, image", batch_size=500):
+    """Rows for the given post ids, looked up batch_size ids per query"""
+    post_ids = list(post_ids)
+    rows = []
+    for start in range(0, len(post_ids), batch_size):
+        batch = post_ids[start:start + batch_size]
+        cursor.execute(f"SELECT {columns} FROM posts WHERE id IN ({', '.join('?' * len(batch))})", batch)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def fetch_admin_page(cursor, after=None, limit=ADMIN_PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of the admin post list, newest first"""
+    sql, params = f"SELECT {ADMIN_COLUMNS} FROM posts", []
+    if after:
+        clause, params = seek_clause(after)
+        sql += " WHERE " + clause
+    cursor.execute(sql + " ORDER BY date_created DESC, id DESC LIMIT ?", params + [limit + 1])
+    rows = cursor.fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def set_published(cursor, post_ids, published):
+    """Publish or unpublish posts in the caller's transaction; returns (id, slug) of those that changed"""
+    changed = [(post_id, slug) for post_id, slug, current, _ in fetch_by_ids(cursor, post_ids)
+               if bool(current) != bool(published)]
+    cursor.executemany("UPDATE posts SET published = ? WHERE id = ?",
+                       [(1 if published else 0, post_id) for post_id, _ in changed])
+    return changed
+
+
+def backfill(conn, only_missing=True, batch_size=500):
+    """Recompute derived fields for stored posts, returning how many changed"""
+    updated = backfill_rows(conn.cursor(), only_missing, batch_size)
+    conn.commit()
+    return updated
+
+
+def backfill_rows(cursor, only_missing=True, batch_size=500):
+    """backfill() without the commit"""
+    if not only_missing:
+        # Clear slugs first so posts can take over each other's base slug
+        cursor.execute("UPDATE posts SET slug = NULL")
+
+    # Walk the table in id order a batch at a time to keep memory flat
+    updated = 0
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, title, content FROM posts WHERE id > ? AND slug IS NULL "
+                       "ORDER BY id LIMIT ?", (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for post_id, title, content in rows:
+            fields = derive_fields(cursor, title, content, post_id)
+            cursor.execute("UPDATE posts SET slug = ?, excerpt = ?, word_count = ?, read_time = ? WHERE id = ?",
+                           (fields['slug'], fields['excerpt'], fields['word_count'], fields['read_time'], post_id))
+        updated += len(rows)
+        last_id = rows[-1][0]
+    return updated
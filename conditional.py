@@ -0,0 +1,109 @@
+"""
+Conditional GET for the AKWAFLOW website
+
+Public pages and the blog API carry strong ETags and Last-Modified headers
+built from a cheap validator query. A request whose If-None-Match (or,
+without one, If-Modified-Since) still matches is answered with a 304
+before the view fetches any rows or renders a template. Every ETag also
+hashes a release id taken from the templates and the asset manifest, so a
+deploy that changes the markup invalidates what clients hold.
+"""
+
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+
+from assets import DIST_DIR, MANIFEST
+
+
+class ConditionalGet:
+    """Answer unchanged GETs with 304 Not Modified from a per-view validator"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.template_folder = None
+        self.static_folder = None
+        self.release_salt = ''
+        self._release = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CONDITIONAL_GET_ENABLED', True)
+        self.release_salt = app.config.get('RELEASE_ID', '')
+        self.template_folder = os.path.join(app.root_path, app.template_folder)
+        self.static_folder = app.static_folder
+        app.extensions['conditional_get'] = self
+
+    @property
+    def release(self):
+        """Hash of the templates and asset manifest, computed once per process"""
+        if self._release is None:
+            digest = hashlib.sha256(self.release_salt.encode())
+            paths = [os.path.join(self.static_folder, DIST_DIR, MANIFEST)]
+            for root, dirs, files in os.walk(self.template_folder):
+                dirs.sort()
+                paths.extend(os.path.join(root, name) for name in sorted(files))
+            for path in paths:
+                try:
+                    with open(path, 'rb') as f:
+                        digest.update(path.encode() + b'\0' + f.read())
+                except FileNotFoundError:
+                    continue  # No asset build yet
+            self._release = digest.hexdigest()[:16]
+        return self._release
+
+    def version(self, *parts):
+        """Identify the content a validator describes, independent of the URL"""
+        key = '\0'.join(str(part) for part in (self.release,) + parts)
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def current_version():
+        """Content version of the request being served, once its validator has run"""
+        return g.get('content_version')
+
+    def etag(self, *parts):
+        key = '\0'.join(str(part) for part in (self.release, request.full_path) + parts)
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def validated(self, validator):
+        """Decorator: validator(**view_args) returns (version parts, last-modified datetime) or None to skip"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # Session holders (admins, pending flash messages) see per-user pages
+                if not self.enabled or request.method not in ('GET', 'HEAD') or session:
+                    return view(**kwargs)
+                validators = validator(**kwargs)
+                if validators is None:
+                    return view(**kwargs)
+
+                parts, modified = validators
+                g.content_version = self.version(*parts)
+                etag = self.etag(*parts)
+                if self._not_modified(etag, modified):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = make_response(view(**kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                response.last_modified = modified
+                # Caches may store the response but must revalidate it on every use
+                response.cache_control.public = True
+                response.cache_control.no_cache = True
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _not_modified(etag, modified):
+        if request.if_none_match:
+            # Weak comparison, as RFC 9110 requires here; proxies that compress weaken ETags
+            return request.if_none_match.contains_weak(etag)
+        if request.if_modified_since and modified:
+            return modified.replace(microsecond=0) <= request.if_modified_since
+        return False
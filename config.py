@@ -14,4 +14,70 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
-    ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL') or 'info@akwaflowltd.com'
\ No newline at end of file
+    ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL') or 'info@akwaflowltd.com'
+
+    # Database settings
+    DATABASE = os.environ.get('DATABASE_PATH') or 'akwaflow.db'
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 8)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'logs/slow_queries.log')  # empty to disable
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS') or 100)
+    SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES') or 1024 * 1024)
+    SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS') or 5)
+    DB_COUNT_QUERIES = os.environ.get('DB_COUNT_QUERIES', 'False').lower() == 'true'  # X-SQL-Queries header, for benchmarks
+
+    # Production server (python run.py prod, settings applied by gunicorn.conf.py)
+    PORT = int(os.environ.get('PORT') or 5000)
+    WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY') or 0)  # 0 sizes from the CPU count
+    WEB_THREADS = int(os.environ.get('WEB_THREADS') or 4)
+    WEB_WORKER_CLASS = os.environ.get('WEB_WORKER_CLASS', 'gthread')  # gthread, gevent or sync
+    WEB_WORKER_CONNECTIONS = int(os.environ.get('WEB_WORKER_CONNECTIONS') or 100)  # gevent only
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS') or 2000)  # recycle workers; 0 disables
+    WEB_MAX_REQUESTS_JITTER = int(os.environ.get('WEB_MAX_REQUESTS_JITTER') or 200)
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT') or 30)
+    WEB_PIDFILE = os.environ.get('WEB_PIDFILE', 'gunicorn.pid')
+    WEB_ACCESS_LOG = os.environ.get('WEB_ACCESS_LOG', '-')  # '-' is stdout, empty disables
+
+    # Rate limits as "requests/seconds" token buckets, per client IP and across all clients (empty disables one)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    # SQLite file shared by worker processes; default in memory, or one in the temp
+    # directory when gunicorn.conf.py starts several workers
+    RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE')
+    RATE_LIMIT_CONTACT = os.environ.get('RATE_LIMIT_CONTACT', '5/300')
+    RATE_LIMIT_CONTACT_GLOBAL = os.environ.get('RATE_LIMIT_CONTACT_GLOBAL', '60/60')
+    RATE_LIMIT_LOGIN = os.environ.get('RATE_LIMIT_LOGIN', '10/300')
+    RATE_LIMIT_LOGIN_GLOBAL = os.environ.get('RATE_LIMIT_LOGIN_GLOBAL', '30/60')
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES') or 0)  # proxies setting X-Forwarded-For in front of the app
+
+    # Repeats of a contact message within this many seconds are counted on the first copy (0 keeps every copy)
+    CONTACT_DUPLICATE_WINDOW = int(os.environ.get('CONTACT_DUPLICATE_WINDOW') or 3600)
+
+    # Outbox delivery settings
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE') or 20)
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL') or 5)
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS') or 8)
+    OUTBOX_BACKOFF_BASE = float(os.environ.get('OUTBOX_BACKOFF_BASE') or 30)
+    OUTBOX_BACKOFF_CAP = float(os.environ.get('OUTBOX_BACKOFF_CAP') or 3600)
+    OUTBOX_LEASE_SECONDS = float(os.environ.get('OUTBOX_LEASE_SECONDS') or 120)
+    OUTBOX_WORKER = os.environ.get('OUTBOX_WORKER', 'True').lower() == 'true'
+
+    # Rendered-page cache settings (set PAGE_CACHE_DIR to share it between workers)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+    PAGE_CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES') or 32 * 1024 * 1024)
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES') or 2000)
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR')
+
+    # Static copies of public pages for Apache to serve (python run.py freeze); empty to disable.
+    # The .htaccess rewrite rules hard-code frozen/, so change them together with this.
+    FREEZE_DIR = os.environ.get('FREEZE_DIR', 'frozen')
+
+    # ETag/Last-Modified revalidation of public pages (RELEASE_ID, e.g. a git SHA, changes every ETag on deploy)
+    CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', 'True').lower() == 'true'
+    RELEASE_ID = os.environ.get('RELEASE_ID', '')
+
+    # Prometheus metrics on /metrics (set METRICS_DIR to aggregate across worker processes;
+    # gunicorn.conf.py picks one in the temp directory when it starts several workers)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # lets a scraper authenticate with a bearer token
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL') or 5)
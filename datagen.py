@@ -0,0 +1,243 @@
+"""
+Synthetic data for scale testing the AKWAFLOW website
+
+generate() bulk-loads realistic posts and contact messages with batched
+executemany calls, one transaction per table. Every value comes from a
+seeded random generator and dates end on a fixed day, so the same seed
+always produces the same data. Derived post fields and search entries are
+computed from the generated text instead of parsing the HTML back.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import blog
+import inbox
+
+WORDS = (
+    'flow', 'meter', 'calibration', 'pipeline', 'integrity', 'corrosion', 'inspection', 'pressure',
+    'valve', 'custody', 'transfer', 'ultrasonic', 'composite', 'wrap', 'offshore', 'terminal',
+    'compliance', 'maintenance', 'measurement', 'commissioning', 'procurement', 'environmental',
+    'monitoring', 'safety', 'engineering', 'accuracy', 'standards', 'gas', 'oil', 'crude', 'export',
+    'metering', 'skid', 'prover', 'density', 'viscosity', 'temperature', 'sensor', 'flange', 'weld',
+    'radiographic', 'magnetic', 'particle', 'penetrant', 'coating', 'liner', 'spool', 'vessel',
+    'platform', 'FPSO', 'riser', 'subsea', 'hydrotest', 'leak', 'detection', 'audit', 'certification',
+    'revenue', 'assurance', 'uncertainty', 'traceability', 'procedure', 'technician', 'downtime',
+    'reliability', 'operators', 'regulatory', 'NNPC', 'DPR', 'field', 'data', 'analysis', 'report',
+)
+TITLE_PATTERNS = (
+    '{A} {B}: Best Practices for {C} {D}',
+    'How {A} {B} Improves {C} {D}',
+    '{A} and {B}: A Guide to {C} {D}',
+    'Lessons from {A} {B} in {C} Operations',
+    'Why {A} {B} Matters for {C} {D}',
+    '{A} {B} Checklist for {C} Teams',
+)
+CATEGORIES = ('Engineering', 'Safety', 'Technical', 'Environmental', 'Industry News', 'Case Studies')
+IMAGES = ('flows.jpg', 'ndt.jpg', 'corrotion.jpeg', 'epic.jpg', 'atmop.jpg', 'hydro.jpg',
+          'FPSO.jpg', 'Spool.jpg', 'Liner coating.jpg', 'Offshore platform deck.jpg')
+FIRST_NAMES = ('Adaeze', 'Babatunde', 'Chinedu', 'Chiamaka', 'Emeka', 'Funmilayo', 'Ibrahim', 'Ifeoma',
+               'Kelechi', 'Ngozi', 'Oluwaseun', 'Tunde', 'Uche', 'Yetunde', 'Aisha', 'David', 'Grace',
+               'James', 'Mary', 'Peter', 'Sarah', 'Samuel', 'Joy', 'Michael')
+LAST_NAMES = ('Okafor', 'Adeyemi', 'Eze', 'Bello', 'Okonkwo', 'Nwosu', 'Abubakar', 'Etim', 'Udo',
+              'Ekpo', 'Akpan', 'Williams', 'Johnson', 'Obi', 'Ibe', 'Balogun', 'Okon', 'Essien')
+DOMAINS = ('example.com', 'example.org', 'example.net', 'mail.example.com', 'energy.example')
+COMPANIES = ('Delta Energy', 'Niger Petroleum', 'Bonny Terminal Services', 'Atlantic Offshore',
+             'Qua Iboe Operations', 'Eket Engineering', '')
+SERVICES = ('Flow Meter Calibration', 'NDT Inspection', 'Corrosion Control', 'EPIC Projects',
+            'Environmental Monitoring', '')
+URGENCIES = ('ASAP', 'Within a month', 'Within 3 months', 'Planning stage', '')
+SENTENCE_POOL_SIZE = 5000  # distinct sentences; bodies are assembled from them to keep generation fast
+MESSAGE_POOL_SIZE = 2000  # distinct contact messages
+BULK_CACHE_KIB = -256 * 1024  # page cache while bulk loading (negative means KiB)
+END_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)  # fixed so the same seed always yields the same dates
+
+
+def _sentence(rng, low=6, high=18):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _title(rng):
+    words = rng.sample(WORDS, 4)
+    return rng.choice(TITLE_PATTERNS).format(
+        A=words[0].capitalize(), B=words[1], C=words[2].capitalize(), D=words[3])
+
+
+def _post_body(rng, sentences, phrases):
+    """Return (html, plain text) for a post of varied structure and length"""
+    html, text = [], []
+    for _ in range(rng.randint(3, 14)):
+        kind = rng.random()
+        if kind < 0.15:
+            heading = rng.choice(phrases).title()
+            html.append(f"<h2>{heading}</h2>")
+            text.append(heading)
+        elif kind < 0.3:
+            items = rng.choices(phrases, k=rng.randint(3, 6))
+            html.append('<ul><li>' + '</li><li>'.join(items) + '</li></ul>')
+            text.extend(items)
+        else:
+            chosen = rng.choices(sentences, k=rng.randint(2, 7))
+            paragraph = ' '.join(chosen)
+            text.append(paragraph)
+            if rng.random() < 0.3:
+                paragraph = f"<strong>{chosen[0]}</strong>{paragraph[len(chosen[0]):]}"
+            html.append(f"<p>{paragraph}</p>")
+    return ''.join(html), ' '.join(text)
+
+
+class _BulkLoad:
+    """Drop a table's secondary indexes and triggers for a bulk insert and rebuild them after
+
+    Building an index once over sorted data is much faster than updating it
+    row by row in random order. The drops, the inserts and the rebuild share
+    one transaction, so a failed or interrupted load leaves the schema intact.
+    """
+
+    def __init__(self, cursor, table):
+        self.cursor = cursor
+        cursor.execute("PRAGMA cache_size")
+        self.cache_size = cursor.fetchone()[0]
+        cursor.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name = ? "
+                       "AND type IN ('index', 'trigger') AND sql IS NOT NULL", (table,))
+        self.objects = cursor.fetchall()
+
+    def __enter__(self):
+        # A larger cache lets the index builds sort in memory
+        self.cursor.execute(f"PRAGMA cache_size = {BULK_CACHE_KIB}")
+        # sqlite3 only opens transactions implicitly for DML, so the DROPs need an explicit one
+        self.cursor.execute("BEGIN")
+        try:
+            for kind, name, _ in self.objects:
+                self.cursor.execute(f'DROP {kind.upper()} "{name}"')
+        except BaseException:
+            self._rollback()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._rollback()
+            return False
+        try:
+            for _, _, sql in self.objects:
+                self.cursor.execute(sql)
+            self.cursor.execute("COMMIT")
+        except BaseException:
+            self._rollback()
+            raise
+        self.cursor.execute(f"PRAGMA cache_size = {self.cache_size}")
+        return False
+
+    def _rollback(self):
+        self.cursor.execute("ROLLBACK")
+        self.cursor.execute(f"PRAGMA cache_size = {self.cache_size}")
+
+
+def generate_posts(conn, count, seed=1, batch_size=5000, years=3):
+    """Insert count generated posts and their search entries in one transaction"""
+    rng = random.Random(f"posts-{seed}")
+    c = conn.cursor()
+    c.execute("SELECT slug FROM posts WHERE slug IS NOT NULL")
+    used = {row[0] for row in c.fetchall()}
+    c.execute("SELECT MAX(seq) FROM sqlite_sequence WHERE name = 'posts'")
+    sequence = c.fetchone()[0] or 0
+    c.execute("SELECT COALESCE(MAX(id), 0) FROM posts")
+    next_id = max(sequence, c.fetchone()[0]) + 1
+
+    sentences = [_sentence(rng) for _ in range(SENTENCE_POOL_SIZE)]
+    phrases = [_sentence(rng, 2, 7)[:-1] for _ in range(SENTENCE_POOL_SIZE // 5)]
+    span = years * 365 * 86400
+    start = int((END_DATE - timedelta(seconds=span)).timestamp())
+    with _BulkLoad(c, 'posts'):
+        _insert_posts(c, rng, count, next_id, used, sentences, phrases, start, span, batch_size)
+        # The published counter's triggers were dropped during the load
+        blog.recount_published(c)
+    return count
+
+
+def _insert_posts(c, rng, count, next_id, used, sentences, phrases, start, span, batch_size):
+    for offset in range(0, count, batch_size):
+        posts, entries = [], []
+        for post_id in range(next_id + offset, next_id + min(count, offset + batch_size)):
+            title = _title(rng)
+            content, text = _post_body(rng, sentences, phrases)
+            category = CATEGORIES[int(rng.random() * len(CATEGORIES))]
+
+            # Same scheme as blog.unique_slug, checked against a set instead of the table
+            base = slug = blog.slugify(title)
+            suffix = 2
+            while slug in used:
+                slug = f"{base}-{suffix}"
+                suffix += 1
+            used.add(slug)
+
+            word_count = len(text.split())
+            posts.append((post_id, title, content, category, IMAGES[int(rng.random() * len(IMAGES))],
+                          start + int(rng.random() * span), int(rng.random() < 0.95), slug,
+                          blog.make_excerpt(text), word_count,
+                          max(1, round(word_count / blog.WORDS_PER_MINUTE))))
+            entries.append((post_id, title, text, category))
+        c.executemany("INSERT INTO posts (id, title, content, category, image, date_created, published, "
+                      "slug, excerpt, word_count, read_time, updated_at) "
+                      "VALUES (?, ?, ?, ?, ?, datetime(?6, 'unixepoch'), ?, ?, ?, ?, ?, datetime(?6, 'unixepoch'))",
+                      posts)
+        c.executemany("INSERT INTO posts_fts (rowid, title, body, category) VALUES (?, ?, ?, ?)", entries)
+
+
+def generate_contacts(conn, count, seed=1, batch_size=20000, years=3, read_ratio=0.7):
+    """Insert count generated contact messages in one transaction"""
+    rng = random.Random(f"contacts-{seed}")
+    messages = [' '.join(_sentence(rng) for _ in range(rng.randint(2, 6))) for _ in range(MESSAGE_POOL_SIZE)]
+    subjects = [_sentence(rng, 3, 8)[:-1] for _ in range(MESSAGE_POOL_SIZE // 4)]
+
+    span = years * 365 * 86400
+    start = int((END_DATE - timedelta(seconds=span)).timestamp())
+    c = conn.cursor()
+    with _BulkLoad(c, 'contacts'):
+        _insert_contacts(c, rng, count, messages, subjects, start, span, read_ratio, batch_size)
+        # The unread counter's triggers were dropped during the load
+        inbox.recount_unread(c)
+    return count
+
+
+def _insert_contacts(c, rng, count, messages, subjects, start, span, read_ratio, batch_size):
+    # random() with indexing is several times faster than choice()/randrange()
+    rand = rng.random
+    names = [(first, last, f"{first} {last}", f"{first}.{last}".lower())
+             for first in FIRST_NAMES for last in LAST_NAMES]
+    for offset in range(0, count, batch_size):
+        rows = []
+        for _ in range(min(batch_size, count - offset)):
+            first, last, name, local = names[int(rand() * len(names))]
+            service = SERVICES[int(rand() * len(SERVICES))]
+            urgency = URGENCIES[int(rand() * len(URGENCIES))]
+            # Built the way the contact view builds it
+            subject = ' | '.join(part for part in (service and f"Service: {service}",
+                                                   urgency and f"Timeline: {urgency}",
+                                                   subjects[int(rand() * len(subjects))]) if part)
+            message = messages[int(rand() * len(messages))]
+            company = COMPANIES[int(rand() * len(COMPANIES))]
+            if company:
+                message += f"\n\nCompany: {company}"
+            rows.append((name, f"{local}{int(rand() * 999) + 1}@{DOMAINS[int(rand() * len(DOMAINS))]}",
+                         subject, message, start + int(rand() * span), int(rand() < read_ratio),
+                         service or None, urgency or None))
+        c.executemany("INSERT INTO contacts (name, email, subject, message, date_created, read, service, urgency) "
+                      "VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'), ?, ?, ?)", rows)
+
+
+def generate(conn, posts=0, contacts=0, seed=1, years=3, read_ratio=0.7, verbose=True):
+    """Bulk-load generated posts and contacts into a migrated database"""
+    if posts:
+        started = time.time()
+        generate_posts(conn, posts, seed, years=years)
+        if verbose:
+            print(f"Generated {posts} posts in {time.time() - started:.1f}s")
+    if contacts:
+        started = time.time()
+        generate_contacts(conn, contacts, seed, years=years, read_ratio=read_ratio)
+        if verbose:
+            print(f"Generated {contacts} contacts in {time.time() - started:.1f}s")
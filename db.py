@@ -0,0 +1,235 @@
+"""
+SQLite data-access layer for the AKWAFLOW website
+
+Connections are opened once in WAL mode, tuned with the pragmas below and
+handed out from a bounded pool. Inside a request the same connection is
+reused for every query and returned to the pool on app-context teardown.
+A process forked after connections were opened (gunicorn's preload,
+Passenger's smart spawning) builds its own pool on first use.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g
+
+from querylog import SlowQueryLog
+
+DEFAULT_DATABASE = 'akwaflow.db'
+
+# Applied to every new connection. WAL lets readers proceed while a writer
+# commits; synchronous=NORMAL is durable across application crashes in WAL
+# mode and avoids an fsync per commit.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('foreign_keys', 'ON'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -16000),          # ~16MB page cache per connection
+    ('mmap_size', 64 * 1024 * 1024),  # 64MB memory-mapped reads
+    ('busy_timeout', 5000),          # ms to wait on a locked database
+)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class CountingCursor(sqlite3.Cursor):
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.finished(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.connection.slow_log is not None and not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)  # keep the rows for the log
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.finished(sql, seq_of_parameters, time.perf_counter() - started, many=True)
+
+
+class CountingConnection(sqlite3.Connection):
+    """Counts and times the statements the application executes (not SQLite's internal ones)"""
+
+    queries = 0
+    query_seconds = 0.0
+    slow_log = None  # querylog.SlowQueryLog set by the pool
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.finished(sql, parameters, time.perf_counter() - started)
+
+    def finished(self, sql, parameters, seconds, many=False):
+        self.queries += 1
+        self.query_seconds += seconds
+        if self.slow_log is not None and seconds >= self.slow_log.threshold:
+            self.slow_log.record(self, sql, parameters, seconds, many)
+
+
+def connect(database=DEFAULT_DATABASE, count_queries=False):
+    """Open a new tuned connection (used by the pool and by scripts)"""
+    conn = sqlite3.connect(database, timeout=5, check_same_thread=False,
+                           factory=CountingConnection if count_queries else sqlite3.Connection)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections reused across threads"""
+
+    def __init__(self, database=DEFAULT_DATABASE, max_size=8, timeout=10, count_queries=False, slow_log=None):
+        self.database = database
+        self.count_queries = count_queries or slow_log is not None
+        self.slow_log = slow_log
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def acquire(self):
+        """Return this thread's connection, checking one out if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = connect(self.database, self.count_queries)
+                if self.slow_log is not None:
+                    conn.slow_log = self.slow_log
+            except Exception:
+                self._slots.release()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self):
+        """Give this thread's connection back once its last user is done"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager for code running outside a request"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release()
+
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_inherited = []  # pools copied from a parent process, kept open but never used
+
+
+def _usable(pool, database):
+    return pool is not None and pool.database == database and pool._pid == os.getpid()
+
+
+def get_pool():
+    """Return the process-wide pool for the current app, a fresh one in each forked worker"""
+    global _pool
+    database = current_app.config.get('DATABASE', DEFAULT_DATABASE)
+    if not _usable(_pool, database):
+        with _pool_lock:
+            if not _usable(_pool, database):
+                if _pool is not None and _pool._pid != os.getpid():
+                    # SQLite connections must not cross a fork. Closing the parent's
+                    # handles here could checkpoint or unlink its WAL, so they are
+                    # only set aside
+                    _inherited.append(_pool)
+                _pool = ConnectionPool(
+                    database,
+                    max_size=current_app.config.get('DB_POOL_SIZE', 8),
+                    timeout=current_app.config.get('DB_POOL_TIMEOUT', 10),
+                    count_queries=(current_app.config.get('DB_COUNT_QUERIES', False)
+                                   or current_app.config.get('METRICS_ENABLED', False)),
+                    slow_log=SlowQueryLog.from_config(current_app.config),
+                )
+    return _pool
+
+
+def get_db():
+    """Return the connection bound to the current app context"""
+    if 'db' not in g:
+        pool = get_pool()
+        g.db = pool.acquire()
+        g.db_pool = pool
+        if pool.count_queries:
+            g.db_queries_before = (g.db.queries, g.db.query_seconds)
+    return g.db
+
+
+def request_query_stats():
+    """(statements, seconds) executed on this app context's connection so far"""
+    if 'db_queries_before' not in g:
+        return 0, 0.0
+    queries, seconds = g.db_queries_before
+    return g.db.queries - queries, g.db.query_seconds - seconds
+
+
+def close_db(exception=None):
+    """Return the app context's connection to the pool"""
+    conn = g.pop('db', None)
+    pool = g.pop('db_pool', None)
+    if conn is not None and pool is not None:
+        pool.release()
+
+
+def query_count_header(response):
+    """Report how many SQL statements the request ran (DB_COUNT_QUERIES)"""
+    response.headers['X-SQL-Queries'] = str(request_query_stats()[0])
+    return response
+
+
+def init_app(app):
+    """Register the pool with a Flask app"""
+    app.config.setdefault('DATABASE', DEFAULT_DATABASE)
+    app.teardown_appcontext(close_db)
+    if app.config.get('DB_COUNT_QUERIES'):
+        app.after_request(query_count_header)
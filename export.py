@@ -0,0 +1,90 @@
+"""
+Streaming CSV and NDJSON exports for the AKWAFLOW website
+
+stream() runs one SELECT inside a read transaction and yields the encoded
+rows a batch at a time as the cursor steps through them, so memory stays
+flat however large the table is. In WAL mode the transaction pins the
+snapshot the export started from: rows written while it runs are not
+included, and nothing is seen twice.
+"""
+
+import csv
+import io
+import json
+from datetime import date
+
+import inbox
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+BATCH_SIZE = 500
+
+# Exportable tables: (columns, ORDER BY)
+TABLES = {
+    'contacts': (('id', 'name', 'email', 'subject', 'message', 'service', 'urgency', 'read', 'date_created',
+                  'duplicates'),
+                 'date_created, id'),
+    'posts': (('id', 'title', 'slug', 'category', 'image', 'published', 'date_created', 'updated_at',
+               'excerpt', 'word_count', 'read_time', 'content'),
+              'id'),
+}
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def filename(table, fmt):
+    return f"{table}-{date.today().isoformat()}.{fmt}"
+
+
+def _csv_value(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def query(table, filters=None):
+    """Return (columns, sql, params) for an export; filters apply to contacts only"""
+    columns, order = TABLES[table]
+    where, params = inbox.filter_clause(filters) if table == 'contacts' and filters else ([], [])
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return columns, sql + f" ORDER BY {order}", params
+
+
+def stream(conn, table, fmt='csv', filters=None, batch_size=BATCH_SIZE):
+    """Yield a table export as text chunks of up to batch_size rows"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}; use one of {', '.join(FORMATS)}")
+    columns, sql, params = query(table, filters)
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                if fmt == 'csv':
+                    writer.writerow([_csv_value(value) for value in row])
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if fmt == 'csv' and buffer.tell():
+            yield buffer.getvalue()  # header of an empty export
+    finally:
+        # Read-only: ending the transaction just releases the snapshot
+        conn.rollback()
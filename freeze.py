@@ -0,0 +1,200 @@
+"""
+Static pre-rendering ("freezing") of public pages for the AKWAFLOW website
+
+freeze() renders the home page, the default /api/blogs page and every
+published post, by id and by slug, to files under FREEZE_DIR. The
+.htaccess rules serve those files straight from Apache to visitors
+without a session cookie, so anonymous traffic never reaches Python.
+A manifest records the version each file was rendered from: a re-freeze
+only renders pages whose posts changed, or everything after a release
+changes the templates. Admin post writes refresh the affected pages as
+soon as they commit.
+"""
+
+import json
+import os
+import tempfile
+
+import blog
+import db
+import related
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No flock (Windows): concurrent manifest updates are not serialized
+
+MANIFEST = 'manifest.json'
+HTACCESS_DIR = 'frozen'  # where the .htaccess rewrite rules look, relative to the document root
+SITE_PAGES = ('/', '/api/blogs')
+BATCH_SIZE = 500
+
+
+def page_file(url):
+    """Path under the freeze directory that .htaccess maps a URL to"""
+    if url == '/':
+        return 'index.html'
+    if url.startswith('/api/'):
+        return url[1:] + '.json'
+    return url[1:] + '.html'
+
+
+def post_urls(post_id, slug):
+    urls = [f"/blog/{post_id}"]
+    # An all-digit slug is routed as an id, so only its id page exists
+    if slug and not slug.isdigit():
+        urls.append(f"/blog/{slug}")
+    return urls
+
+
+class _ManifestLock:
+    def __init__(self, directory):
+        self.path = os.path.join(directory, 'manifest.lock')
+
+    def __enter__(self):
+        self.file = open(self.path, 'w')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+class Freezer:
+    """Render public pages to static files and keep them current"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        directory = app.config.get('FREEZE_DIR')
+        self.directory = os.path.join(app.root_path, directory) if directory else None
+        app.extensions['freezer'] = self
+
+    @property
+    def active(self):
+        """True once a freeze has been run into the directory"""
+        return bool(self.directory) and os.path.exists(os.path.join(self.directory, MANIFEST))
+
+    def _release(self):
+        conditional = self.app.extensions.get('conditional_get')
+        return conditional.release if conditional else ''
+
+    def pages(self, cursor):
+        """Yield (url, version) for every page a freeze writes"""
+        release = self._release()
+        updated_at, count = blog.content_version(cursor)
+        for url in SITE_PAGES:
+            yield url, f"{release}:{updated_at}:{count}"
+        last_id = 0
+        while True:
+            cursor.execute(f"SELECT id, slug, updated_at, {related.VERSION_COLUMNS} FROM posts "
+                           "WHERE published = 1 AND id > ? ORDER BY id LIMIT ?", (last_id, BATCH_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for post_id, slug, updated_at, neighbours, _ in rows:
+                for url in post_urls(post_id, slug):
+                    yield url, f"{release}:{updated_at}:{neighbours}"
+            last_id = rows[-1][0]
+
+    def _render(self, client, url):
+        """Render a page anonymously and write it, or remove its file when it no longer exists"""
+        response = client.get(url)
+        path = os.path.join(self.directory, page_file(url))
+        if response.status_code != 200:
+            if os.path.exists(path):
+                os.remove(path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write beside the target and rename so Apache never serves a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(response.get_data())
+        os.replace(tmp, path)
+        return True
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp, os.path.join(self.directory, MANIFEST))
+
+    def freeze(self, force=False, verbose=True):
+        """Render pages whose version changed (all of them with force) and remove stale files
+
+        Returns (rendered, removed, unchanged) counts.
+        """
+        if not self.directory:
+            raise RuntimeError("FREEZE_DIR is not set")
+        os.makedirs(self.directory, exist_ok=True)
+        previous = {} if force else self._load_manifest()
+        client = self.app.test_client()
+        current, rendered, unchanged = {}, 0, 0
+
+        with self.app.app_context():
+            for url, version in self.pages(db.get_db().cursor()):
+                current[url] = version
+                if previous.get(url) == version and os.path.exists(os.path.join(self.directory, page_file(url))):
+                    unchanged += 1
+                    continue
+                if self._render(client, url):
+                    rendered += 1
+                    if verbose and rendered % 1000 == 0:
+                        print(f"Rendered {rendered} pages...")
+                else:
+                    current.pop(url)
+
+        stale = [url for url in previous if url not in current]
+        for url in stale:
+            path = os.path.join(self.directory, page_file(url))
+            if os.path.exists(path):
+                os.remove(path)
+        with _ManifestLock(self.directory):
+            self._save_manifest(current)
+        return rendered, len(stale), unchanged
+
+    def refresh_post(self, post_id, *slugs):
+        """Re-render the pages a committed post write affects (no-op until the first freeze)"""
+        self.refresh_posts({post_id: slugs})
+
+    def refresh_posts(self, posts):
+        """refresh_post() for several posts at once: {post_id: slugs it was reachable by}"""
+        if not self.active or not posts:
+            return
+        c = db.get_db().cursor()
+        release = self._release()
+        updated_at, count = blog.content_version(c)
+        site_version = f"{release}:{updated_at}:{count}"
+        versions = {}
+        for post_id, slugs in posts.items():
+            c.execute(f"SELECT slug, updated_at, published, {related.VERSION_COLUMNS} FROM posts WHERE id = ?",
+                      (post_id,))
+            row = c.fetchone()
+            urls = {url for slug in slugs for url in post_urls(post_id, slug)}
+            if row and row[2]:
+                urls.update(post_urls(post_id, row[0]))
+            for url in urls:
+                versions[url] = f"{release}:{row[1]}:{row[3]}" if row else None
+
+        client = self.app.test_client()
+        with _ManifestLock(self.directory):
+            manifest = self._load_manifest()
+            for url in SITE_PAGES + tuple(sorted(versions)):
+                if self._render(client, url):
+                    manifest[url] = site_version if url in SITE_PAGES else versions[url]
+                else:
+                    manifest.pop(url, None)
+            self._save_manifest(manifest)
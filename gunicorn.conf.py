@@ -0,0 +1,77 @@
+"""
+Gunicorn settings for the AKWAFLOW website
+
+Used by `python run.py prod` and picked up by any gunicorn started from
+this directory. Values come from the WEB_* settings in config.py.
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from config import Config
+
+_cpus = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{Config.PORT}"
+worker_class = Config.WEB_WORKER_CLASS
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("gevent is not installed (pip install gevent); using threaded workers")
+        worker_class = 'gthread'
+
+# Threads and greenlets wait on SQLite and SMTP, not the CPU, so a few processes go a long way
+workers = Config.WEB_WORKERS or (_cpus + 1 if worker_class == 'gevent' else _cpus * 2 + 1)
+threads = Config.WEB_THREADS
+worker_connections = Config.WEB_WORKER_CONNECTIONS
+
+# Each worker only counts its own requests and fills its own rate-limit
+# buckets, so with several workers /metrics and the limits need state they
+# all share. Set it before the app is loaded.
+if workers > 1 and Config.METRICS_ENABLED and not Config.METRICS_DIR:
+    Config.METRICS_DIR = os.path.join(tempfile.gettempdir(), f"akwaflow-metrics-{Config.PORT}")
+    os.environ['METRICS_DIR'] = Config.METRICS_DIR
+if workers > 1 and Config.RATE_LIMIT_ENABLED and not Config.RATE_LIMIT_STORE:
+    Config.RATE_LIMIT_STORE = os.path.join(tempfile.gettempdir(), f"akwaflow-ratelimit-{Config.PORT}.db")
+    os.environ['RATE_LIMIT_STORE'] = Config.RATE_LIMIT_STORE
+
+# Import the app once in the master so workers share its pages copy-on-write.
+# gevent must patch the standard library before the app is imported, so it
+# loads the app in each worker instead.
+preload_app = worker_class != 'gevent'
+
+# Recycle workers after a jittered number of requests to bound slow leaks
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS_JITTER
+
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_TIMEOUT
+keepalive = 5
+pidfile = Config.WEB_PIDFILE or None
+accesslog = Config.WEB_ACCESS_LOG or None
+errorlog = '-'
+
+
+def on_starting(server):
+    """Runs once in the master before any worker is started
+
+    Snapshots left in METRICS_DIR by a previous server belong to processes
+    that are gone (or whose pids may be reused), so start from zero.
+    """
+    import metrics
+    if Config.METRICS_DIR:
+        metrics.reset(Config.METRICS_DIR)
+
+
+def post_worker_init(worker):
+    """Runs in each worker once the app is loaded (after gevent has patched)
+
+    Database pools notice the fork and reconnect by themselves; the outbox
+    delivery thread has to be started per worker.
+    """
+    from app import app
+    import outbox
+    if app.config['OUTBOX_WORKER']:
+        outbox.start_worker(app)
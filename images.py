@@ -0,0 +1,174 @@
+"""
+Responsive image derivatives for the AKWAFLOW website
+
+Every uploaded or shipped image gets a set of width-bounded JPEG and WebP
+copies under static/derived, saved without EXIF or other metadata. Their
+dimensions are recorded in the images table so templates can emit srcset,
+sizes, width and height without touching the files.
+"""
+
+import hashlib
+import os
+import re
+import time
+
+from markupsafe import Markup, escape
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None  # Pillow not installed, images are served as uploaded
+
+WIDTHS = (320, 640, 960, 1280, 1920)
+FORMATS = (('webp', 'WEBP', 'image/webp'), ('jpg', 'JPEG', 'image/jpeg'))
+QUALITY = {'WEBP': 78, 'JPEG': 80}
+DERIVED_DIR = 'derived'
+DEFAULT_SIZES = '100vw'
+
+# path -> (width, height, widths) for processed images already looked up in this process
+_dimensions = {}
+
+
+def available():
+    """True when Pillow is installed and derivatives can be generated"""
+    return Image is not None
+
+
+def derived_name(path, width, ext):
+    """Static-relative filename of one derivative of a static-relative image path"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    safe = re.sub(r'[^a-z0-9_-]+', '-', stem.lower()).strip('-') or 'image'
+    digest = hashlib.sha1(path.encode()).hexdigest()[:8]
+    return f"{DERIVED_DIR}/{safe}-{digest}-{width}.{ext}"
+
+
+def process(static_folder, path):
+    """Write the derivatives of static_folder/path and return (width, height, widths)"""
+    with Image.open(os.path.join(static_folder, path)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    width, height = image.size
+
+    # Never upscale: keep the widths below the original plus the original width itself
+    widths = [w for w in WIDTHS if w < width] + [min(width, WIDTHS[-1])]
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    rgba = image.convert('RGBA') if has_alpha else image.convert('RGB')
+    if has_alpha:
+        # JPEG has no alpha channel, so flatten onto white
+        flat = Image.new('RGB', rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.split()[-1])
+    else:
+        flat = rgba
+
+    os.makedirs(os.path.join(static_folder, DERIVED_DIR), exist_ok=True)
+    for w in widths:
+        size = (w, max(1, round(height * w / width)))
+        for ext, fmt, _ in FORMATS:
+            base = rgba if fmt == 'WEBP' else flat
+            resized = base if size == base.size else base.resize(size, Image.LANCZOS)
+            # Saving without exif/icc arguments drops the source metadata
+            resized.save(os.path.join(static_folder, derived_name(path, w, ext)),
+                         fmt, quality=QUALITY[fmt], optimize=True, **({'method': 6} if fmt == 'WEBP' else {}))
+    return width, height, widths
+
+
+def record(cursor, path, width, height, widths):
+    cursor.execute("INSERT OR REPLACE INTO images (path, width, height, widths, processed_at) "
+                   "VALUES (?, ?, ?, ?, ?)",
+                   (path, width, height, ','.join(str(w) for w in widths), time.time()))
+    _dimensions.pop(path, None)
+
+
+def generate(static_folder, path):
+    """Write derivatives without touching the database, returning (width, height, widths) or None"""
+    if not available():
+        return None
+    try:
+        return process(static_folder, path)
+    except (OSError, ValueError) as e:
+        print(f"Could not process image {path}: {e}")
+        return None
+
+
+def process_and_record(cursor, static_folder, path):
+    """Generate and record derivatives, returning False if that is not possible"""
+    dimensions = generate(static_folder, path)
+    if dimensions is None:
+        return False
+    record(cursor, path, *dimensions)
+    return True
+
+
+def remove(cursor, static_folder, path):
+    """Delete an image's derivatives and its record"""
+    cursor.execute("SELECT widths FROM images WHERE path = ?", (path,))
+    row = cursor.fetchone()
+    if row:
+        for w in row[0].split(','):
+            for ext, _, _ in FORMATS:
+                try:
+                    os.remove(os.path.join(static_folder, derived_name(path, int(w), ext)))
+                except FileNotFoundError:
+                    pass
+    cursor.execute("DELETE FROM images WHERE path = ?", (path,))
+    _dimensions.pop(path, None)
+
+
+def process_directory(conn, static_folder, subdir, force=False):
+    """Process every image in static_folder/subdir, returning how many were done"""
+    c = conn.cursor()
+    c.execute("SELECT path FROM images")
+    done = {row[0] for row in c.fetchall()}
+    count = 0
+    directory = os.path.join(static_folder, subdir)
+    if not os.path.isdir(directory):
+        return 0
+    for name in sorted(os.listdir(directory)):
+        path = f"{subdir}/{name}"
+        if not name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+            continue
+        if path in done and not force:
+            continue
+        if process_and_record(c, static_folder, path):
+            count += 1
+            conn.commit()
+    return count
+
+
+def lookup(cursor, path):
+    """Return (width, height, widths) for a processed image, or None"""
+    if path not in _dimensions:
+        cursor.execute("SELECT width, height, widths FROM images WHERE path = ?", (path,))
+        row = cursor.fetchone()
+        if row is None:
+            # Not cached, so a later batch run is picked up without a restart
+            return None
+        _dimensions[path] = (row[0], row[1], [int(w) for w in row[2].split(',')])
+    return _dimensions[path]
+
+
+def picture(url_for, cursor, path, alt='', sizes=DEFAULT_SIZES, class_='', fallback=None, lazy=True):
+    """Render a <picture> element with WebP and JPEG srcsets for a static image"""
+    info = lookup(cursor, path)
+    attrs = f'alt="{escape(alt)}" class="{escape(class_)}" decoding="async"'
+    if lazy:
+        attrs += ' loading="lazy"'
+    if fallback:
+        attrs += f' onerror="this.onerror=null;this.src=\'{escape(url_for("static", filename=fallback))}\'"'
+    if info is None:
+        return Markup(f'<img src="{escape(url_for("static", filename=path))}" {attrs}>')
+
+    width, height, widths = info
+    sources = []
+    for ext, _, mimetype in FORMATS:
+        srcset = ', '.join(f'{url_for("static", filename=derived_name(path, w, ext))} {w}w' for w in widths)
+        sources.append((mimetype, srcset))
+    largest = url_for('static', filename=derived_name(path, widths[-1], 'jpg'))
+    return Markup(
+        '<picture>'
+        f'<source type="{sources[0][0]}" srcset="{escape(sources[0][1])}" sizes="{escape(sizes)}">'
+        f'<img src="{escape(largest)}" srcset="{escape(sources[1][1])}" sizes="{escape(sizes)}" '
+        f'width="{width}" height="{height}" {attrs}>'
+        '</picture>'
+    )
@@ -0,0 +1,183 @@
+"""
+Contact inbox queries for the AKWAFLOW website
+
+The admin inbox is served a page at a time with keyset pagination over
+indexed columns, and the unread count is kept in the counters table by
+triggers so the dashboard never has to count rows. Repeat submissions of
+a message are recognised by a content fingerprint and counted on the
+original row instead of being stored and mailed again.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from pagination import encode_cursor, seek_clause
+
+UNREAD_COUNTER = 'unread_contacts'
+PAGE_SIZE = 50
+
+# Listing columns, in the order the admin template indexes them
+LIST_COLUMNS = "id, name, email, subject, message, date_created, read, service, urgency, duplicates"
+
+NON_WORD = re.compile(r'[\W_]+')
+RECENT_SIZE = 1024
+
+# Bulk inbox actions: (statement, condition limiting it to rows it would change)
+BULK_ACTIONS = {
+    'read': ("UPDATE contacts SET read = 1", "read = 0"),
+    'unread': ("UPDATE contacts SET read = 0", "read = 1"),
+    'delete': ("DELETE FROM contacts", None),
+}
+
+
+def fingerprint(email, subject, message):
+    """Hash of a submission that ignores case, spacing and punctuation"""
+    parts = [email.strip().lower()]
+    parts.extend(' '.join(NON_WORD.sub(' ', text.casefold()).split()) for text in (subject, message))
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()[:32]
+
+
+# fingerprint -> (contact id, seconds since the epoch it was first stored), most recent last.
+# Only ever a shortcut to the original row: other workers' submissions are found in the table.
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _remember(key, contact_id, created):
+    with _recent_lock:
+        _recent.pop(key, None)
+        _recent[key] = (contact_id, created)
+        while len(_recent) > RECENT_SIZE:
+            _recent.popitem(last=False)
+
+
+def record_duplicate(cursor, key, window):
+    """Count a repeat of a message first seen within window seconds; False if it is new
+
+    The UPDATE takes the database write lock before the fingerprint is looked
+    up, so two workers racing on the same message cannot both miss it. The
+    caller keeps that transaction open through store_fingerprint().
+    """
+    if window <= 0:
+        return False
+    with _recent_lock:
+        recent = _recent.get(key)
+    if recent and recent[1] >= time.time() - window:
+        cursor.execute("UPDATE contacts SET duplicates = duplicates + 1, last_duplicate_at = CURRENT_TIMESTAMP "
+                       "WHERE id = ?", (recent[0],))
+        if cursor.rowcount:
+            return True
+    # Not seen by this process, or the original row has been deleted since
+    cursor.execute("UPDATE contacts SET duplicates = duplicates + 1, last_duplicate_at = CURRENT_TIMESTAMP "
+                   "WHERE id = (SELECT contact_id FROM contact_fingerprints "
+                   "WHERE fingerprint = ? AND created >= datetime('now', ?))",
+                   (key, f"-{int(window)} seconds"))
+    return cursor.rowcount > 0
+
+
+def store_fingerprint(cursor, key, contact_id, window):
+    """Record a new message's fingerprint and drop the ones older than the window"""
+    if window <= 0:
+        return
+    cursor.execute("DELETE FROM contact_fingerprints WHERE created < datetime('now', ?)",
+                   (f"-{int(window)} seconds",))
+    cursor.execute("INSERT OR REPLACE INTO contact_fingerprints (fingerprint, contact_id) VALUES (?, ?)",
+                   (key, contact_id))
+    _remember(key, contact_id, time.time())
+
+
+def recount_unread(cursor):
+    """Reset the unread counter from the table (repairs drift after manual edits)"""
+    cursor.execute("UPDATE counters SET value = (SELECT COUNT(*) FROM contacts WHERE read = 0) WHERE name = ?",
+                   (UNREAD_COUNTER,))
+
+
+def unread_count(cursor):
+    cursor.execute("SELECT value FROM counters WHERE name = ?", (UNREAD_COUNTER,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def parse_filters(args):
+    """Read inbox filters from request args, raising ValueError on bad input"""
+    filters = {
+        'unread': args.get('unread') in ('1', 'true', 'on'),
+        'read': args.get('read', '').strip(),
+        'email': args.get('email', '').strip(),
+        'service': args.get('service', '').strip(),
+        'urgency': args.get('urgency', '').strip(),
+        'date_from': args.get('date_from', '').strip(),
+        'date_to': args.get('date_to', '').strip(),
+    }
+    for key in ('date_from', 'date_to'):
+        if filters[key]:
+            date.fromisoformat(filters[key])
+    if filters['read'] not in ('', '0', '1'):
+        raise ValueError("read must be 0 or 1")
+    return filters
+
+
+def filter_clause(filters):
+    """Return WHERE fragments and parameters for parsed filters"""
+    where, params = [], []
+    if filters.get('unread'):
+        where.append("read = 0")
+    elif filters.get('read'):
+        where.append("read = ?")
+        params.append(int(filters['read']))
+    for column in ('email', 'service', 'urgency'):
+        if filters.get(column):
+            where.append(f"{column} = ?")
+            params.append(filters[column])
+    if filters.get('date_from'):
+        where.append("date_created >= ?")
+        params.append(filters['date_from'])
+    if filters.get('date_to'):
+        # Inclusive end date: everything before the following midnight
+        where.append("date_created < ?")
+        params.append((date.fromisoformat(filters['date_to']) + timedelta(days=1)).isoformat())
+    return where, params
+
+
+def fetch_page(cursor, filters, after=None, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of the inbox, newest first"""
+    where, params = filter_clause(filters)
+    if after:
+        clause, seek_params = seek_clause(after)
+        where.append(clause)
+        params.extend(seek_params)
+
+    sql = f"SELECT {LIST_COLUMNS} FROM contacts"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    cursor.execute(sql + " ORDER BY date_created DESC, id DESC LIMIT ?", params + [limit + 1])
+    rows = cursor.fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1][5], rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def bulk_apply(cursor, action, ids=None, filters=None):
+    """Apply a bulk action to the listed ids, or else to every contact matching filters
+
+    Runs in the caller's transaction and returns the number of rows changed.
+    """
+    statement, condition = BULK_ACTIONS[action]
+    where = [condition] if condition else []
+    if ids is not None:
+        cursor.executemany(f"{statement} WHERE {' AND '.join(where + ['id = ?'])}", [(i,) for i in ids])
+        return max(cursor.rowcount, 0)
+    clause, params = filter_clause(filters or {})
+    where.extend(clause)
+    cursor.execute(statement + (" WHERE " + " AND ".join(where) if where else ""), params)
+    return cursor.rowcount
+
+
+def service_options(cursor):
+    """Distinct services seen so far, for the filter dropdown (reads the index only)"""
+    cursor.execute("SELECT DISTINCT service FROM contacts WHERE service IS NOT NULL AND service != '' ORDER BY service")
+    return [row[0] for row in cursor.fetchall()]
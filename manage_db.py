@@ -3,113 +3,106 @@
 Database management script for AKWAFLOW website
 """
 
-import sqlite3
 import os
-from datetime import datetime
+import sys
+import time
+import db
+import schema
+import seed
+import datagen
+import outbox
+import blog
+import search
+import related
+import images
+import uploads
+import inbox
+import querylog
+import export
+from config import Config
+
+DATABASE = Config.DATABASE
+
+def open_db(migrate=True):
+    """Open the database, applying pending migrations unless told not to"""
+    conn = db.connect(DATABASE)
+    if migrate:
+        schema.migrate(conn)
+    return conn
 
 def init_database():
-    """Initialize the database with tables and sample data"""
-    conn = sqlite3.connect('akwaflow.db')
-    c = conn.cursor()
-    
-    # Create tables
-    c.execute('''CREATE TABLE IF NOT EXISTS posts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        content TEXT NOT NULL,
-        category TEXT,
-        image TEXT,
-        date_created DATETIME DEFAULT CURRENT_TIMESTAMP,
-        published BOOLEAN DEFAULT 1
-    )''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS contacts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL,
-        subject TEXT,
-        message TEXT NOT NULL,
-        date_created DATETIME DEFAULT CURRENT_TIMESTAMP,
-        read BOOLEAN DEFAULT 0
-    )''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS admin_users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL
-    )''')
-    
-    # Create default admin user
-    c.execute("INSERT OR IGNORE INTO admin_users (username, password) VALUES ('admin', 'admin123')")
-    
-    conn.commit()
+    """Create or upgrade the database schema (the default admin and sample posts come with it)"""
+    conn = open_db(migrate=False)
+    applied = schema.migrate(conn)
+    conn.close()
+    if applied:
+        print(f"Database initialized successfully! Applied {len(applied)} migrations.")
+    else:
+        print("Database is already up to date.")
+
+def migrate_database(target=None):
+    """Apply pending migrations, optionally stopping at a target version"""
+    conn = open_db(migrate=False)
+    applied = schema.migrate(conn, target=target)
+    version = schema.current_version(conn)
     conn.close()
-    print("Database initialized successfully!")
+    print(f"Applied {len(applied)} migrations; schema is at version {version}.")
+
+def show_migration_status():
+    """Show the schema version and any pending migrations"""
+    conn = open_db(migrate=False)
+    version, latest, names = schema.status(conn)
+    conn.close()
+    print(f"Schema version: {version} (latest {latest})")
+    if names:
+        print("Pending migrations:")
+        for name in names:
+            print(f"- {name}")
+    else:
+        print("No pending migrations.")
 
 def add_sample_posts():
     """Add sample blog posts"""
-    conn = sqlite3.connect('akwaflow.db')
+    conn = open_db()
     c = conn.cursor()
-    
-    sample_posts = [
-        (
-            "Flow Meter Calibration: Best Practices for Accurate Measurements",
-            "<p>Flow meter calibration is a critical process in the oil and gas industry, ensuring accurate custody transfer measurements that are essential for revenue assurance and regulatory compliance.</p><p>At AKWAFLOW, we specialize in providing comprehensive calibration services that meet the highest industry standards. Our team of certified technicians uses state-of-the-art equipment and follows internationally recognized procedures to ensure your flow meters operate with maximum precision.</p><h2>Key Benefits</h2><ul><li>Improved measurement accuracy and reliability</li><li>Compliance with NNPC and international standards</li><li>Enhanced revenue assurance through precise custody transfer</li><li>Reduced operational risks and measurement uncertainties</li><li>Comprehensive documentation and certification</li></ul><p>Contact us today to learn more about our flow meter calibration services and how we can help optimize your measurement systems for maximum accuracy and compliance.</p>",
-            "Engineering",
-            "flows.jpg",
-            1
-        ),
-        (
-            "Pipeline Integrity Management: Ensuring Safe Operations",
-            "<p>Pipeline integrity management is crucial for maintaining safe and efficient operations in the oil and gas industry. Our comprehensive approach combines advanced inspection techniques with proactive maintenance strategies.</p><p>We utilize various Non-Destructive Testing (NDT) methods including ultrasonic testing, radiographic testing, magnetic particle inspection, and dye penetrant testing to assess pipeline condition and identify potential issues before they become critical.</p><h2>Our Services Include</h2><ul><li>Comprehensive pipeline inspections</li><li>Risk assessment and management</li><li>Corrosion monitoring and control</li><li>Emergency response planning</li><li>Regulatory compliance support</li></ul><p>Trust AKWAFLOW for reliable pipeline integrity solutions that protect your assets and ensure operational continuity.</p>",
-            "Safety",
-            "ndt.jpg",
-            1
-        ),
-        (
-            "Advanced Corrosion Control Solutions for Critical Infrastructure",
-            "<p>Corrosion is one of the most significant challenges facing the oil and gas industry, causing billions of dollars in damage annually. Our advanced composite wrap technology provides robust and long-lasting protection for critical infrastructure.</p><p>AKWAFLOW's corrosion control solutions combine innovative materials with proven application techniques to deliver superior protection against environmental and operational stresses.</p><h2>Technology Advantages</h2><ul><li>High-strength composite materials</li><li>Rapid installation with minimal downtime</li><li>Long-term durability and reliability</li><li>Cost-effective maintenance solutions</li><li>Environmental compliance</li></ul><p>Protect your infrastructure investment with our proven corrosion control technologies.</p>",
-            "Technical",
-            "corrotion.jpeg",
-            1
-        ),
-        (
-            "EPIC Projects: Engineering Excellence in Oil & Gas",
-            "<p>Engineering, Procurement, Installation & Commissioning (EPIC) projects require meticulous planning, expert execution, and comprehensive project management. AKWAFLOW delivers end-to-end EPIC solutions that meet the demanding requirements of the oil and gas industry.</p><p>Our multidisciplinary team brings together engineering expertise, procurement efficiency, and installation excellence to deliver projects on time and within budget.</p><h2>Our EPIC Capabilities</h2><ul><li>Conceptual and detailed engineering design</li><li>Strategic procurement and vendor management</li><li>Professional installation and construction</li><li>Comprehensive commissioning and startup</li><li>Project management and quality assurance</li></ul><p>Partner with AKWAFLOW for your next EPIC project and experience the difference that engineering excellence makes.</p>",
-            "Engineering",
-            "epic.jpg",
-            1
-        ),
-        (
-            "Environmental Monitoring: Atmospheric Particle Measurement Solutions",
-            "<p>Environmental compliance and air quality monitoring are critical components of responsible industrial operations. AKWAFLOW's atmospheric particle measurement solutions provide accurate, real-time data to support environmental management and regulatory compliance.</p><p>Our advanced monitoring systems utilize cutting-edge sensor technology and data analytics to deliver comprehensive environmental intelligence.</p><h2>Monitoring Solutions</h2><ul><li>Real-time particle concentration measurement</li><li>Multi-parameter environmental monitoring</li><li>Data logging and remote access capabilities</li><li>Regulatory compliance reporting</li><li>Environmental impact assessment</li></ul><p>Ensure environmental compliance and protect community health with our proven atmospheric monitoring solutions.</p>",
-            "Environmental",
-            "atmop.jpg",
-            1
-        )
-    ]
-    
-    for title, content, category, image, published in sample_posts:
-        c.execute("INSERT OR IGNORE INTO posts (title, content, category, image, published) VALUES (?, ?, ?, ?, ?)",
-                 (title, content, category, image, published))
-    
+    post_ids = seed.add_sample_posts(c)
+    for post_id in post_ids:
+        related.update_post(c, post_id)
     conn.commit()
     conn.close()
-    print("Sample posts added successfully!")
+    print(f"Added {len(post_ids)} sample posts.")
+
+def generate_data(posts=0, contacts=0, seed=1, years=3, read_ratio=0.7):
+    """Bulk-load synthetic posts and contacts for scale testing"""
+    conn = open_db()
+    datagen.generate(conn, posts, contacts, seed=seed, years=years, read_ratio=read_ratio)
+    if posts:
+        start = time.perf_counter()
+        count = related.rebuild(conn)
+        print(f"Related posts rebuilt for {count} posts in {time.perf_counter() - start:.1f}s.")
+    conn.close()
+    print(f"Generated data with seed {seed}.")
+
+def option(args, name, default, convert=int):
+    """Value following --name in args, or default"""
+    if f"--{name}" in args:
+        return convert(args[args.index(f"--{name}") + 1])
+    return default
 
 def reset_database():
     """Reset the database (WARNING: This will delete all data)"""
-    if os.path.exists('akwaflow.db'):
-        os.remove('akwaflow.db')
+    if os.path.exists(DATABASE):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(DATABASE + suffix):
+                os.remove(DATABASE + suffix)
         print("Database deleted.")
     
     init_database()
-    add_sample_posts()
     print("Database reset complete!")
 
 def show_stats():
     """Show database statistics"""
-    conn = sqlite3.connect('akwaflow.db')
+    conn = open_db()
     c = conn.cursor()
     
     c.execute("SELECT COUNT(*) FROM posts")
@@ -132,22 +125,172 @@ def show_stats():
     print(f"- Total contacts: {contact_count}")
     print(f"- Unread contacts: {unread_count}")
 
-if __name__ == "__main__":
-    import sys
+def backfill_posts(recompute_all=False):
+    """Compute slug, excerpt, word count and read time for stored posts"""
+    conn = open_db()
+    count = blog.backfill(conn, only_missing=not recompute_all)
+    conn.close()
+    print(f"Backfilled derived fields for {count} posts.")
+
+def rebuild_search_index():
+    """Rebuild the full-text search index from the posts table"""
+    conn = open_db()
+    count = search.rebuild(conn)
+    conn.close()
+    print(f"Search index rebuilt with {count} posts.")
+
+def rebuild_related_posts():
+    """Recompute the related-posts vectors and neighbour lists"""
+    conn = open_db()
+    start = time.perf_counter()
+    count = related.rebuild(conn)
+    conn.close()
+    print(f"Related posts rebuilt for {count} posts in {time.perf_counter() - start:.1f}s.")
+
+def build_images(force=False):
+    """Generate responsive derivatives for shipped and uploaded images"""
+    if not images.available():
+        print("Pillow is not installed. Run: pip install Pillow")
+        return
+    
+    conn = open_db()
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for subdir in ('img', 'uploads'):
+        count = images.process_directory(conn, static_folder, subdir, force=force)
+        print(f"Processed {count} images in static/{subdir}")
+    conn.close()
+
+def collect_uploads():
+    """Recount upload references and delete files no post uses"""
+    conn = open_db()
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    upload_folder = os.path.join(static_folder, 'uploads')
+    count = uploads.recount(conn, upload_folder)
+    removed = uploads.collect(conn, upload_folder, static_folder)
+    conn.close()
+    print(f"Checked {count} uploaded files, removed {len(removed)} unreferenced.")
+
+def show_outbox():
+    """Show email outbox statistics and recent failures"""
+    conn = open_db()
+    c = conn.cursor()
+    
+    c.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+    counts = dict(c.fetchall())
     
+    c.execute("SELECT id, recipient, attempts, last_error FROM outbox "
+              "WHERE status = 'dead' ORDER BY id DESC LIMIT 10")
+    dead = c.fetchall()
+    conn.close()
+    
+    print("Email Outbox:")
+    for status in ('pending', 'sent', 'dead'):
+        print(f"- {status.capitalize()}: {counts.get(status, 0)}")
+    for message_id, recipient, attempts, last_error in dead:
+        print(f"  #{message_id} to {recipient} after {attempts} attempts: {last_error}")
+
+def retry_outbox():
+    """Requeue dead-lettered emails for delivery"""
+    conn = open_db()
+    count = outbox.requeue_dead(conn)
+    conn.close()
+    print(f"Requeued {count} dead-lettered emails.")
+
+def export_table(table, fmt='csv', output=None, read=None, date_from=None, date_to=None):
+    """Stream a table as CSV or NDJSON to a file or stdout"""
+    if table not in export.TABLES or fmt not in export.FORMATS:
+        print(f"Use one of {', '.join(export.TABLES)} as CSV or NDJSON (--format {'|'.join(export.FORMATS)})")
+        return
+    try:
+        filters = inbox.parse_filters({'read': read or '', 'date_from': date_from or '', 'date_to': date_to or ''})
+    except ValueError:
+        print("--read must be 0 or 1 and dates YYYY-MM-DD")
+        return
+    conn = open_db()
+    out = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        for chunk in export.stream(conn, table, fmt, filters):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+        conn.close()
+    if output:
+        print(f"Exported {table} to {output}.")
+
+def analyze_slow_queries(top=10):
+    """Summarize the slow-query log and re-check each statement's current plan"""
+    path = Config.SLOW_QUERY_LOG
+    groups = querylog.summarize(querylog.read(path)) if path else []
+    if not groups:
+        print(f"No slow queries logged in {path or '(SLOW_QUERY_LOG is disabled)'}.")
+        return
+
+    conn = open_db()
+    print(f"Slow queries in {path} (threshold {Config.SLOW_QUERY_MS:g} ms), worst total time first:")
+    for number, group in enumerate(groups[:top], start=1):
+        params = group['params']
+        if isinstance(params, dict) and 'rows' in params:
+            params = params['row']  # executemany: plan one row
+        placeholders = dict.fromkeys(params) if isinstance(params, dict) else [None] * len(params or ())
+        plan = querylog.explain(conn, group['sql'], placeholders) or group['plan']
+        flags = querylog.plan_flags(plan)
+
+        print(f"\n{number}. {group['count']}x, total {group['total_ms']:.1f} ms, "
+              f"max {group['max_ms']:.1f} ms, avg {group['total_ms'] / group['count']:.1f} ms")
+        print(f"   {group['sql']}")
+        if group['endpoints']:
+            print(f"   Routes: {', '.join(sorted(group['endpoints']))}")
+        for line in plan or ():
+            print(f"   | {line}")
+        for flag in flags:
+            print(f"   ! {flag}")
+    conn.close()
+
+if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python manage_db.py [init|reset|stats|add_posts]")
+        print("Usage: python manage_db.py [init|migrate [version]|status|reset|stats|add_posts|generate [--posts N] [--contacts N] [--seed N]|backfill [--all]|reindex|related|images [--force]|gc_uploads|outbox|retry_outbox|analyze [--top N]|export contacts|posts [--format csv|ndjson] [--read 0|1] [--from DATE] [--to DATE] [--output FILE]]")
         sys.exit(1)
     
     command = sys.argv[1]
     
     if command == "init":
         init_database()
+    elif command == "migrate":
+        migrate_database(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif command == "status":
+        show_migration_status()
     elif command == "reset":
         reset_database()
     elif command == "stats":
         show_stats()
     elif command == "add_posts":
         add_sample_posts()
+    elif command == "generate":
+        args = sys.argv[2:]
+        generate_data(posts=option(args, 'posts', 1000), contacts=option(args, 'contacts', 10000),
+                      seed=option(args, 'seed', 1), years=option(args, 'years', 3),
+                      read_ratio=option(args, 'read-ratio', 0.7, float))
+    elif command == "backfill":
+        backfill_posts(recompute_all='--all' in sys.argv[2:])
+    elif command == "reindex":
+        rebuild_search_index()
+    elif command == "related":
+        rebuild_related_posts()
+    elif command == "images":
+        build_images(force='--force' in sys.argv[2:])
+    elif command == "gc_uploads":
+        collect_uploads()
+    elif command == "outbox":
+        show_outbox()
+    elif command == "retry_outbox":
+        retry_outbox()
+    elif command == "export":
+        args = sys.argv[3:]
+        export_table(sys.argv[2] if len(sys.argv) > 2 else 'contacts', fmt=option(args, 'format', 'csv', str),
+                     output=option(args, 'output', None, str), read=option(args, 'read', None, str),
+                     date_from=option(args, 'from', None, str), date_to=option(args, 'to', None, str))
+    elif command == "analyze":
+        analyze_slow_queries(top=option(sys.argv[2:], 'top', 10))
     else:
-        print("Unknown command. Use: init, reset, stats, or add_posts")
\ No newline at end of file
+        print("Unknown command. Use: init, migrate, status, reset, stats, add_posts, generate, backfill, reindex, related, images, gc_uploads, outbox, retry_outbox, export, or analyze")
\ No newline at end of file
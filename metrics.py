@@ -0,0 +1,321 @@
+"""
+Request metrics for the AKWAFLOW website in Prometheus text format
+
+Each process keeps its counters, gauges and histograms in memory. When
+METRICS_DIR is set, every process also writes a snapshot there every few
+seconds, and a scrape adds up the snapshots of all gunicorn/Passenger
+workers and the outbox process. Counts from workers that have exited are
+folded into an archive file so totals never go backwards; their in-flight
+gauges are dropped.
+"""
+
+import atexit
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import g, request, template_rendered, before_render_template
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No flock (Windows): dead workers' files are summed but never archived
+
+import db
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (type, help, histogram buckets)
+DEFINITIONS = {
+    'akwaflow_http_requests_total': ('counter', 'HTTP requests by endpoint, method and status', None),
+    'akwaflow_http_request_duration_seconds': ('histogram', 'Request latency by endpoint', LATENCY_BUCKETS),
+    'akwaflow_http_requests_in_flight': ('gauge', 'Requests currently being handled', None),
+    'akwaflow_request_sql_statements': ('histogram', 'SQL statements executed per request', STATEMENT_BUCKETS),
+    'akwaflow_request_sql_seconds': ('histogram', 'Time spent executing SQL per request', LATENCY_BUCKETS),
+    'akwaflow_template_render_seconds': ('histogram', 'Template render time', LATENCY_BUCKETS),
+    'akwaflow_rate_limited_total': ('counter', 'Requests rejected with 429 by endpoint and bucket scope', None),
+    'akwaflow_contact_duplicates_total': ('counter', 'Contact submissions collapsed into an earlier copy', None),
+    'akwaflow_email_deliveries_total': ('counter', 'Outbox delivery attempts by result', None),
+    'akwaflow_email_delivery_seconds': ('histogram', 'Outbox SMTP delivery time by result', LATENCY_BUCKETS),
+    'akwaflow_outbox_messages': ('gauge', 'Outbox messages by status', None),
+    'akwaflow_unread_contacts': ('gauge', 'Unread contact messages', None),
+}
+ARCHIVE = 'archive.json'
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def reset(directory):
+    """Delete the snapshots and archive left by an earlier server so counts start from zero"""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.tmp')):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+class _Registry:
+    """One process's samples: {(name, labels): value or [bucket counts..., sum, count]}"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = DEFINITIONS[name][2]
+        key = (name, labels)
+        with self.lock:
+            entry = self.samples.get(key)
+            if entry is None:
+                entry = self.samples[key] = [0] * (len(buckets) + 3)
+            # Non-cumulative counts per bucket, the +Inf overflow, then sum and count
+            index = len(buckets)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    index = i
+                    break
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return [[name, [list(pair) for pair in labels], value if not isinstance(value, list) else list(value)]
+                    for (name, labels), value in self.samples.items()]
+
+
+def _merge(into, samples, gauges=True):
+    for name, labels, value in samples:
+        if name not in DEFINITIONS or (not gauges and DEFINITIONS[name][0] == 'gauge'):
+            continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if isinstance(value, list):
+            current = into.get(key)
+            into[key] = value[:] if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class Metrics:
+    """Flask extension recording request, SQL, template and email metrics"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.directory = None
+        self.token = None
+        self.flush_interval = 5
+        self._registry = None
+        self._registry_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.directory = app.config.get('METRICS_DIR')
+        self.token = app.config.get('METRICS_TOKEN')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        before_render_template.connect(self._start_template, app)
+        template_rendered.connect(self._finish_template, app)
+
+    @property
+    def registry(self):
+        """This process's registry; a forked worker starts its own"""
+        registry = self._registry
+        if registry is None or registry.pid != os.getpid():
+            with self._registry_lock:
+                registry = self._registry
+                if registry is None or registry.pid != os.getpid():
+                    registry = self._registry = _Registry()
+                    if self.directory:
+                        threading.Thread(target=self._flush_loop, args=(registry,), daemon=True).start()
+        return registry
+
+    def inc(self, name, labels=None, value=1):
+        if self.enabled:
+            self.registry.inc(name, _labels(labels), value)
+
+    def observe(self, name, value, labels=None):
+        if self.enabled:
+            self.registry.observe(name, value, _labels(labels))
+
+    # Request hooks
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        self.registry.inc('akwaflow_http_requests_in_flight')
+
+    def _record_status(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, exception=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        registry = self.registry
+        endpoint = (('endpoint', request.endpoint or 'none'),)
+        registry.inc('akwaflow_http_requests_in_flight', value=-1)
+        registry.observe('akwaflow_http_request_duration_seconds', time.perf_counter() - started, endpoint)
+        registry.inc('akwaflow_http_requests_total', _labels({
+            'endpoint': request.endpoint or 'none',
+            'method': request.method,
+            'status': g.pop('metrics_status', 500),
+        }))
+        statements, seconds = db.request_query_stats()
+        registry.observe('akwaflow_request_sql_statements', statements, endpoint)
+        registry.observe('akwaflow_request_sql_seconds', seconds, endpoint)
+
+    def _start_template(self, sender, template, context, **extra):
+        g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+    def _finish_template(self, sender, template, context, **extra):
+        starts = g.get('metrics_templates')
+        if starts:
+            self.registry.observe('akwaflow_template_render_seconds', time.perf_counter() - starts.pop(),
+                                  (('template', template.name or 'string'),))
+
+    # Cross-process aggregation
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self, registry=None):
+        """Write this process's snapshot for other processes to aggregate"""
+        if not self.directory:
+            return
+        registry = registry or self.registry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(tmp, self._snapshot_path(registry.pid))
+
+    def _flush_loop(self, registry):
+        while registry is self._registry:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush(registry)
+            except OSError as e:
+                print(f"Could not write metrics snapshot: {e}")
+
+    def _load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def _archive_dead(self, pid):
+        """Fold an exited process's counters into the archive and remove its snapshot"""
+        with open(os.path.join(self.directory, 'archive.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = self._snapshot_path(pid)
+            if not os.path.exists(path):
+                return  # Another process archived it first
+            archived = {}
+            _merge(archived, self._load(os.path.join(self.directory, ARCHIVE)))
+            _merge(archived, self._load(path), gauges=False)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump([[name, [list(p) for p in labels], value] for (name, labels), value in archived.items()], f)
+            os.replace(tmp, os.path.join(self.directory, ARCHIVE))
+            os.remove(path)
+
+    def collect(self):
+        """Samples summed over every process sharing METRICS_DIR"""
+        merged = {}
+        own = self.registry.snapshot()
+        _merge(merged, own)
+        if not self.directory:
+            return merged
+
+        own_pid = os.getpid()
+        for filename in os.listdir(self.directory):
+            stem, ext = os.path.splitext(filename)
+            if ext != '.json' or not stem.isdigit() or int(stem) == own_pid:
+                continue
+            pid = int(stem)
+            if _pid_alive(pid):
+                _merge(merged, self._load(os.path.join(self.directory, filename)))
+            elif fcntl is not None:
+                self._archive_dead(pid)
+            else:
+                _merge(merged, self._load(os.path.join(self.directory, filename)), gauges=False)
+        _merge(merged, self._load(os.path.join(self.directory, ARCHIVE)), gauges=False)
+        return merged
+
+    def render(self, gauges=()):
+        """Prometheus text exposition; gauges adds (name, labels, value) read at scrape time"""
+        merged = self.collect()
+        for name, labels, value in gauges:
+            merged[(name, _labels(labels))] = value
+
+        by_name = {}
+        for (name, labels), value in merged.items():
+            by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text, buckets = DEFINITIONS[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def authorized(self, req):
+        """True when the request carries the configured METRICS_TOKEN as a bearer token"""
+        header = req.headers.get('Authorization', '')
+        return bool(self.token) and header.startswith('Bearer ') and \
+            hmac.compare_digest(header[7:].encode(), self.token.encode())
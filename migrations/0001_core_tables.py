@@ -0,0 +1,29 @@
+"""Posts, contacts and admin users"""
+
+
+def upgrade(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        category TEXT,
+        image TEXT,
+        date_created DATETIME DEFAULT CURRENT_TIMESTAMP,
+        published BOOLEAN DEFAULT 1
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS contacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        subject TEXT,
+        message TEXT NOT NULL,
+        date_created DATETIME DEFAULT CURRENT_TIMESTAMP,
+        read BOOLEAN DEFAULT 0
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS admin_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL
+    )''')
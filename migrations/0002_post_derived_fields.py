@@ -0,0 +1,101 @@
+"""Slug, excerpt, word count and read time columns, plus the listing indexes"""
+
+import re
+import unicodedata
+from html.parser import HTMLParser
+
+EXCERPT_LENGTH = 150
+WORDS_PER_MINUTE = 200
+SLUG_MAX_LENGTH = 80
+
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul',
+}
+SKIP_TAGS = {'script', 'style', 'template'}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def _strip_html(content):
+    parser = _TextExtractor()
+    parser.feed(content or '')
+    parser.close()
+    return ' '.join(''.join(parser.parts).split())
+
+
+def _excerpt(text):
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0] or text[:EXCERPT_LENGTH]
+    return cut.rstrip(' ,.;:') + '...'
+
+
+def _slugify(title):
+    slug = unicodedata.normalize('NFKD', title or '').encode('ascii', 'ignore').decode()
+    slug = re.sub(r'[^a-z0-9]+', '-', slug.lower()).strip('-')
+    return slug[:SLUG_MAX_LENGTH].rstrip('-') or 'post'
+
+
+def _unique_slug(cursor, title, post_id):
+    base = slug = _slugify(title)
+    suffix = 2
+    while True:
+        cursor.execute("SELECT 1 FROM posts WHERE slug = ? AND id IS NOT ?", (slug, post_id))
+        if cursor.fetchone() is None:
+            return slug
+        slug = f"{base}-{suffix}"
+        suffix += 1
+
+
+def upgrade(cursor):
+    cursor.execute("PRAGMA table_info(posts)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, definition in (('slug', 'TEXT'), ('excerpt', 'TEXT'), ('word_count', 'INTEGER'),
+                             ('read_time', 'INTEGER')):
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE posts ADD COLUMN {name} {definition}")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_slug ON posts (slug)")
+
+    # Walk the table in id order a batch at a time to keep memory flat
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, title, content FROM posts WHERE id > ? AND slug IS NULL "
+                       "ORDER BY id LIMIT 500", (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for post_id, title, content in rows:
+            text = _strip_html(content)
+            word_count = len(text.split())
+            cursor.execute("UPDATE posts SET slug = ?, excerpt = ?, word_count = ?, read_time = ? WHERE id = ?",
+                           (_unique_slug(cursor, title, post_id), _excerpt(text), word_count,
+                            max(1, round(word_count / WORDS_PER_MINUTE)), post_id))
+        last_id = rows[-1][0]
+
+    # Keyset indexes for the newest-first post listings in api_blogs
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_published_date ON posts (published, date_created, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_category_date ON posts (category, published, date_created, id)")
@@ -0,0 +1,69 @@
+"""Full-text search index over posts"""
+
+from html.parser import HTMLParser
+
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul',
+}
+SKIP_TAGS = {'script', 'style', 'template'}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def _strip_html(content):
+    parser = _TextExtractor()
+    parser.feed(content or '')
+    parser.close()
+    return ' '.join(''.join(parser.parts).split())
+
+
+def upgrade(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+    if cursor.fetchone() is None:
+        cursor.execute('''CREATE VIRTUAL TABLE posts_fts USING fts5(
+            title, body, category,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )''')
+        # BM25 column weights: title matches count most, then category, then body
+        cursor.execute("INSERT INTO posts_fts (posts_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')")
+
+    cursor.execute("DELETE FROM posts_fts")
+    # Read in id order a batch at a time to keep memory flat
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, title, content, category FROM posts WHERE id > ? ORDER BY id LIMIT 500",
+                       (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany("INSERT INTO posts_fts (rowid, title, body, category) VALUES (?, ?, ?, ?)",
+                           [(post_id, title, _strip_html(content), category or '')
+                            for post_id, title, content, category in rows])
+        last_id = rows[-1][0]
+
+    # Merge the index b-trees so queries touch as few pages as possible
+    cursor.execute("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
@@ -0,0 +1,11 @@
+"""Responsive image derivative records"""
+
+
+def upgrade(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS images (
+        path TEXT PRIMARY KEY,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        widths TEXT NOT NULL,
+        processed_at REAL NOT NULL
+    )''')
@@ -0,0 +1,12 @@
+"""Content-addressed upload reference counts"""
+
+
+def upgrade(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS uploads (
+        filename TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        uploaded_at REAL NOT NULL
+    )''')
+    # Lets uploads.recount() find the posts using a file without scanning
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_image ON posts (image)")
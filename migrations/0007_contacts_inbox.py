@@ -0,0 +1,47 @@
+"""Contact service/urgency columns, inbox indexes and the unread counter"""
+
+import re
+
+SUBJECT_SERVICE = re.compile(r'(?:^|\| )Service: ([^|]+?)(?: \||$)')
+SUBJECT_URGENCY = re.compile(r'(?:^|\| )Timeline: ([^|]+?)(?: \||$)')
+
+
+def upgrade(cursor):
+    cursor.execute("PRAGMA table_info(contacts)")
+    existing = {row[1] for row in cursor.fetchall()}
+    added = False
+    for name in ('service', 'urgency'):
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE contacts ADD COLUMN {name} TEXT")
+            added = True
+    if added:
+        # Recover service and timeline from subjects written before they had columns
+        cursor.execute("SELECT id, subject FROM contacts "
+                       "WHERE subject LIKE '%Service: %' OR subject LIKE '%Timeline: %'")
+        for contact_id, subject in cursor.fetchall():
+            service = SUBJECT_SERVICE.search(subject)
+            urgency = SUBJECT_URGENCY.search(subject)
+            cursor.execute("UPDATE contacts SET service = ?, urgency = ? WHERE id = ?",
+                           (service.group(1) if service else None, urgency.group(1) if urgency else None,
+                            contact_id))
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_read_date ON contacts (read, date_created, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_date ON contacts (date_created, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_email ON contacts (email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_service_date ON contacts (service, date_created, id)")
+
+    cursor.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    cursor.execute("INSERT OR IGNORE INTO counters (name, value) "
+                   "SELECT 'unread_contacts', COUNT(*) FROM contacts WHERE read = 0")
+
+    # Keep counters.unread_contacts equal to COUNT(*) WHERE read = 0 on every write path
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS contacts_unread_insert AFTER INSERT ON contacts
+       WHEN NOT NEW.read
+       BEGIN UPDATE counters SET value = value + 1 WHERE name = 'unread_contacts'; END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS contacts_unread_delete AFTER DELETE ON contacts
+       WHEN NOT OLD.read
+       BEGIN UPDATE counters SET value = value - 1 WHERE name = 'unread_contacts'; END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS contacts_unread_update AFTER UPDATE OF read ON contacts
+       WHEN (NOT OLD.read) != (NOT NEW.read)
+       BEGIN UPDATE counters SET value = value + (CASE WHEN NEW.read THEN -1 ELSE 1 END)
+             WHERE name = 'unread_contacts'; END''')
@@ -0,0 +1,33 @@
+"""posts.updated_at and a published-post counter, the validators for conditional GETs"""
+
+
+def upgrade(cursor):
+    cursor.execute("PRAGMA table_info(posts)")
+    if 'updated_at' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE posts ADD COLUMN updated_at TEXT")
+        cursor.execute("UPDATE posts SET updated_at = COALESCE(date_created, strftime('%Y-%m-%d %H:%M:%f', 'now'))")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_published_updated ON posts (published, updated_at)")
+
+    cursor.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    cursor.execute("INSERT OR IGNORE INTO counters (name, value) "
+                   "SELECT 'published_posts', COUNT(*) FROM posts WHERE published = 1")
+
+    # Keep posts.updated_at current on every write, unless the writer sets it (millisecond
+    # resolution, so quick successive edits differ), and counters.published_posts equal to
+    # COUNT(*) WHERE published = 1
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS posts_updated_at_insert AFTER INSERT ON posts
+       WHEN NEW.updated_at IS NULL
+       BEGIN UPDATE posts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id; END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS posts_updated_at_update AFTER UPDATE ON posts
+       WHEN NEW.updated_at IS OLD.updated_at
+       BEGIN UPDATE posts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id; END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS posts_published_insert AFTER INSERT ON posts
+       WHEN NEW.published
+       BEGIN UPDATE counters SET value = value + 1 WHERE name = 'published_posts'; END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS posts_published_delete AFTER DELETE ON posts
+       WHEN OLD.published
+       BEGIN UPDATE counters SET value = value - 1 WHERE name = 'published_posts'; END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS posts_published_update AFTER UPDATE OF published ON posts
+       WHEN (NOT OLD.published) != (NOT NEW.published)
+       BEGIN UPDATE counters SET value = value + (CASE WHEN NEW.published THEN 1 ELSE -1 END)
+             WHERE name = 'published_posts'; END''')
@@ -0,0 +1,18 @@
+"""Duplicate counters on contacts and the recent-fingerprints table"""
+
+
+def upgrade(cursor):
+    cursor.execute("PRAGMA table_info(contacts)")
+    existing = {row[1] for row in cursor.fetchall()}
+    if 'duplicates' not in existing:
+        cursor.execute("ALTER TABLE contacts ADD COLUMN duplicates INTEGER NOT NULL DEFAULT 0")
+    if 'last_duplicate_at' not in existing:
+        cursor.execute("ALTER TABLE contacts ADD COLUMN last_duplicate_at DATETIME")
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS contact_fingerprints (
+        fingerprint TEXT PRIMARY KEY,
+        contact_id INTEGER NOT NULL REFERENCES contacts (id) ON DELETE CASCADE,
+        created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contact_fingerprints_created ON contact_fingerprints (created)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contact_fingerprints_contact ON contact_fingerprints (contact_id)")
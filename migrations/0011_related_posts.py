@@ -0,0 +1,121 @@
+"""Related-posts vectors and precomputed neighbour lists
+
+Fills the tables the way related.rebuild() did when this was written: TF-IDF
+vectors over title, search-index text and category, pruned to the strongest
+terms, and the top cosine matches of each published post.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+TOP_K = 3
+TERMS_PER_POST = 40
+POSTINGS_PER_TERM = 50
+TITLE_WEIGHT = 3
+CATEGORY_WEIGHT = 3
+
+TOKEN = re.compile(r'[a-z][a-z0-9]{2,}')
+STOP_WORDS = frozenset('''
+    about above after again against all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here hers him his
+    how into its itself just more most nor not now off once only other our ours out over own same she should
+    some such than that the their theirs them then there these they this those through too under until very
+    was were what when where which while who whom why will with would you your yours
+'''.split())
+
+
+def _tokens(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def _term_counts(title, text, category):
+    counts = Counter(_tokens(text or ''))
+    for term in _tokens(title or ''):
+        counts[term] += TITLE_WEIGHT
+    if category:
+        counts['category:' + category.strip().lower()] += CATEGORY_WEIGHT
+    return counts
+
+
+def _vector(counts, idf):
+    weights = [(term, (1 + math.log(count)) * idf.get(term, 0.0)) for term, count in counts.items()]
+    weights = heapq.nlargest(TERMS_PER_POST, (w for w in weights if w[1] > 0), key=itemgetter(1))
+    norm = math.sqrt(sum(w * w for _, w in weights))
+    return {term: w / norm for term, w in weights} if norm else {}
+
+
+def _published(cursor):
+    last_id = 0
+    while True:
+        cursor.execute("SELECT p.id, p.title, f.body, p.category FROM posts p "
+                       "JOIN posts_fts f ON f.rowid = p.id WHERE p.published = 1 AND p.id > ? "
+                       "ORDER BY p.id LIMIT 500", (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def upgrade(cursor):
+    cursor.execute("CREATE TABLE IF NOT EXISTS related_terms (term TEXT PRIMARY KEY, idf REAL NOT NULL) WITHOUT ROWID")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS related_vectors (
+        term TEXT NOT NULL,
+        post_id INTEGER NOT NULL,
+        weight REAL NOT NULL,
+        PRIMARY KEY (term, post_id)
+    ) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_related_vectors_post ON related_vectors (post_id)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS related_posts (
+        post_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        related_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (post_id, rank)
+    ) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_related_posts_related ON related_posts (related_id)")
+
+    # Document frequencies first; term counts are recomputed below to keep memory flat
+    df = Counter()
+    documents = 0
+    for _, title, text, category in _published(cursor):
+        df.update(_term_counts(title, text, category).keys())
+        documents += 1
+    idf = {term: math.log((1 + documents) / (1 + n)) for term, n in df.items()}
+    del df
+
+    vectors = {post_id: _vector(_term_counts(title, text, category), idf)
+               for post_id, title, text, category in _published(cursor)}
+
+    # Compare posts only through the heaviest postings of each term
+    postings = defaultdict(list)
+    for post_id, vector in vectors.items():
+        for term, weight in vector.items():
+            postings[term].append((weight, post_id))
+    for term, entries in postings.items():
+        if len(entries) > POSTINGS_PER_TERM:
+            postings[term] = heapq.nlargest(POSTINGS_PER_TERM, entries)
+
+    neighbours = []
+    for post_id, vector in vectors.items():
+        scores = {}
+        for term, weight in vector.items():
+            for other_weight, other_id in postings[term]:
+                scores[other_id] = scores.get(other_id, 0.0) + weight * other_weight
+        scores.pop(post_id, None)
+        for rank, (other_id, score) in enumerate(heapq.nlargest(TOP_K, scores.items(), key=itemgetter(1))):
+            neighbours.append((post_id, rank, other_id, score))
+
+    cursor.execute("DELETE FROM related_terms")
+    cursor.execute("DELETE FROM related_vectors")
+    cursor.execute("DELETE FROM related_posts")
+    cursor.executemany("INSERT INTO related_terms (term, idf) VALUES (?, ?)", idf.items())
+    cursor.executemany("INSERT INTO related_vectors (term, post_id, weight) VALUES (?, ?, ?)",
+                       ((term, post_id, weight) for post_id, vector in vectors.items()
+                        for term, weight in vector.items()))
+    cursor.executemany("INSERT INTO related_posts (post_id, rank, related_id, score) VALUES (?, ?, ?, ?)",
+                       neighbours)
+    cursor.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('related_documents', ?)", (documents,))
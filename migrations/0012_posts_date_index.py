@@ -0,0 +1,5 @@
+"""Index for the admin post list, which pages over drafts and published posts alike"""
+
+
+def upgrade(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_date ON posts (date_created, id)")
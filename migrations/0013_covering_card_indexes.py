@@ -0,0 +1,15 @@
+"""Covering indexes for the blog card listings
+
+blog_cards() reads every card column from the index alone instead of
+visiting each posts row, whose HTML content spills onto overflow pages.
+The new indexes keep the old key prefixes, so they replace them.
+"""
+
+
+def upgrade(cursor):
+    cursor.execute("DROP INDEX IF EXISTS idx_posts_published_date")
+    cursor.execute("DROP INDEX IF EXISTS idx_posts_category_date")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_published_cards ON posts "
+                   "(published, date_created, id, slug, title, excerpt, category, image, read_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_category_cards ON posts "
+                   "(category, published, date_created, id, slug, title, excerpt, image, read_time)")
@@ -0,0 +1,169 @@
+"""
+Persistent email outbox for the AKWAFLOW website
+
+Views queue messages with enqueue() inside their own transaction, so a
+message exists exactly when the row that triggered it does. A background
+worker drains the table, retrying failures with exponential backoff and
+dead-lettering messages that keep failing.
+"""
+
+import threading
+import time
+
+from db import get_db
+
+_mail_lock = threading.Lock()
+
+# Set whenever a message is queued so an idle worker wakes immediately
+_wakeup = threading.Event()
+
+
+def get_mail(app):
+    """Return the app's Flask-Mail extension, creating it on first delivery
+
+    Web workers that never send mail never import or configure Flask-Mail.
+    """
+    mail = app.extensions.get('mail')
+    if mail is None:
+        with _mail_lock:
+            mail = app.extensions.get('mail')
+            if mail is None:
+                from flask_mail import Mail
+                mail = Mail(app)
+    return mail
+
+
+def enqueue(cursor, recipient, subject, body, reply_to=None):
+    """Queue a message; the caller commits it with its own transaction"""
+    now = time.time()
+    cursor.execute(
+        "INSERT INTO outbox (recipient, subject, body, reply_to, next_attempt_at, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (recipient, subject, body, reply_to, now, now))
+    return cursor.lastrowid
+
+
+def notify():
+    """Wake the worker after queued messages have been committed"""
+    _wakeup.set()
+
+
+def backoff_delay(attempts, base, cap):
+    """Seconds to wait before retry number `attempts`"""
+    return min(cap, base * (2 ** (attempts - 1)))
+
+
+def requeue_dead(conn):
+    """Move dead-lettered messages back to pending for another round"""
+    c = conn.cursor()
+    c.execute("UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? "
+              "WHERE status = 'dead'", (time.time(),))
+    conn.commit()
+    return c.rowcount
+
+
+class OutboxWorker(threading.Thread):
+    """Background thread that delivers queued messages"""
+
+    def __init__(self, app):
+        super().__init__(name='outbox-worker', daemon=True)
+        self.app = app
+        self.batch_size = app.config['OUTBOX_BATCH_SIZE']
+        self.poll_interval = app.config['OUTBOX_POLL_INTERVAL']
+        self.max_attempts = app.config['OUTBOX_MAX_ATTEMPTS']
+        self.backoff_base = app.config['OUTBOX_BACKOFF_BASE']
+        self.backoff_cap = app.config['OUTBOX_BACKOFF_CAP']
+        self.lease = app.config['OUTBOX_LEASE_SECONDS']
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        _wakeup.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            _wakeup.clear()
+            try:
+                delivered = self.drain_once()
+            except Exception as e:
+                print(f"Outbox worker error: {e}")
+                delivered = 0
+            if not delivered:
+                _wakeup.wait(self.poll_interval)
+
+    def drain_once(self):
+        """Deliver one batch of due messages, returning how many were handled"""
+        with self.app.app_context():
+            conn = get_db()
+            batch = self._claim_batch(conn)
+            for message in batch:
+                self._deliver(conn, message)
+            return len(batch)
+
+    def _claim_batch(self, conn):
+        """Lease due messages so concurrent workers never send one twice"""
+        now = time.time()
+        c = conn.cursor()
+        c.execute("SELECT id, recipient, subject, body, reply_to, attempts FROM outbox "
+                  "WHERE status = 'pending' AND next_attempt_at <= ? "
+                  "ORDER BY next_attempt_at LIMIT ?", (now, self.batch_size))
+        claimed = []
+        for row in c.fetchall():
+            c.execute("UPDATE outbox SET next_attempt_at = ? "
+                      "WHERE id = ? AND status = 'pending' AND next_attempt_at <= ?",
+                      (now + self.lease, row[0], now))
+            if c.rowcount == 1:
+                claimed.append(row)
+        conn.commit()
+        return claimed
+
+    def _deliver(self, conn, message):
+        message_id, recipient, subject, body, reply_to, attempts = message
+        from flask_mail import Message
+        c = conn.cursor()
+        metrics = self.app.extensions.get('metrics')
+        started = time.perf_counter()
+        try:
+            mail = get_mail(self.app)
+            msg = Message(subject=subject,
+                          sender=self.app.config['MAIL_DEFAULT_SENDER'],
+                          recipients=[recipient],
+                          reply_to=reply_to,
+                          body=body)
+            mail.send(msg)
+        except Exception as e:
+            attempts += 1
+            result = 'dead' if attempts >= self.max_attempts else 'failed'
+            if result == 'dead':
+                c.execute("UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                          (attempts, str(e), message_id))
+                print(f"Outbox message {message_id} dead-lettered after {attempts} attempts: {e}")
+            else:
+                delay = backoff_delay(attempts, self.backoff_base, self.backoff_cap)
+                c.execute("UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                          (attempts, str(e), time.time() + delay, message_id))
+                print(f"Outbox message {message_id} failed (attempt {attempts}), retrying in {delay}s: {e}")
+        else:
+            c.execute("UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL "
+                      "WHERE id = ?", (attempts + 1, time.time(), message_id))
+            print(f"Outbox message {message_id} sent to {recipient}")
+            result = 'sent'
+        conn.commit()
+        if metrics is not None:
+            metrics.inc('akwaflow_email_deliveries_total', {'result': result})
+            metrics.observe('akwaflow_email_delivery_seconds', time.perf_counter() - started, {'result': result})
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_worker(app):
+    """Start the delivery thread for this process (idempotent)"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(app)
+            _worker.start()
+    return _worker
+
@@ -0,0 +1,210 @@
+"""
+Rendered-page cache for the AKWAFLOW website
+
+Public pages only change when an admin writes a post, so their rendered
+bodies are kept in a size-bounded in-process LRU and, when PAGE_CACHE_DIR
+is set, in a file tier shared by every worker process on the host. Admin
+write paths invalidate exactly the keys a change affects. Each entry also
+records the content version it was rendered from, and a lookup only hits
+when that still matches the current one, so workers whose private copies
+were not invalidated re-render instead of serving a stale page.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request, session
+
+INDEX_KEY = 'index'
+
+
+def post_key(post_id):
+    return f"blog_post:{post_id}"
+
+
+def slug_key(slug):
+    return f"blog_slug:{slug}"
+
+
+class _FileTier:
+    """Cache entries stored as files, shared across worker processes"""
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.page')
+
+    def version(self, key):
+        """Identify the stored entry so in-memory copies can be validated"""
+        try:
+            return os.stat(self.path(key)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                version = os.fstat(f.fileno()).st_mtime_ns
+                header, _, body = f.read().partition(b'\n')
+        except FileNotFoundError:
+            return None
+        mimetype, _, content_version = header.decode().partition(' ')
+        return body, mimetype, version, content_version or None
+
+    def set(self, key, body, mimetype, content_version=None):
+        # Write beside the target and rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(f"{mimetype} {content_version or ''}".encode() + b'\n' + body)
+        os.replace(tmp, self.path(key))
+        self._writes += 1
+        if self._writes % 50 == 0:
+            self.prune()
+        return self.version(key)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Drop the least recently written files beyond max_entries"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.page'):
+                try:
+                    entries.append((os.stat(os.path.join(self.directory, name)).st_mtime_ns, name))
+                except FileNotFoundError:
+                    pass
+        entries.sort()
+        for _, name in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.page'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class PageCache:
+    """LRU cache of rendered responses with an optional shared file tier"""
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.max_bytes = 0
+        self.max_entries = 0
+        self.files = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', True)
+        self.max_bytes = app.config.get('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        self.max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 2000)
+        directory = app.config.get('PAGE_CACHE_DIR')
+        self.files = _FileTier(directory, self.max_entries) if directory else None
+        app.extensions['page_cache'] = self
+
+    def get(self, key, content_version=None):
+        """Return (body, mimetype) for a key rendered from content_version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if self.files is None:
+            return entry[:2] if entry and entry[3] == content_version else None
+
+        # Another worker may have replaced or invalidated the shared copy
+        if entry is None or self.files.version(key) != entry[2]:
+            entry = self.files.get(key)
+            if entry is None:
+                self._discard(key)
+                return None
+            self._remember(key, *entry)
+        return entry[:2] if entry[3] == content_version else None
+
+    def set(self, key, body, mimetype, content_version=None):
+        version = self.files.set(key, body, mimetype, content_version) if self.files else None
+        self._remember(key, body, mimetype, version, content_version)
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self._discard(key)
+            if self.files:
+                self.files.delete(key)
+
+    def invalidate_post(self, post_id, *slugs):
+        """Drop every page that shows the given post"""
+        self.invalidate(INDEX_KEY, post_key(post_id), *(slug_key(s) for s in slugs if s))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.files:
+            self.files.clear()
+
+    def _remember(self, key, body, mimetype, version, content_version):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (body, mimetype, version, content_version)
+            self._size += len(body)
+            while self._size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+
+    def _discard(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+
+    def cached(self, key_func, version_func=lambda: None):
+        """Decorator caching a view's 200 responses under key_func(**view_args)
+
+        version_func() names the content the response is rendered from; an
+        entry stored under another version is a miss.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # Anyone with a session (admins, pending flash messages) gets a fresh render
+                if not self.enabled or request.method != 'GET' or session:
+                    return view(**kwargs)
+
+                key = key_func(**kwargs)
+                content_version = version_func()
+                hit = self.get(key, content_version)
+                if hit is not None:
+                    response = make_response(hit[0])
+                    response.mimetype = hit[1]
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(view(**kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    self.set(key, response.get_data(), response.mimetype, content_version)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
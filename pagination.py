@@ -0,0 +1,32 @@
+"""
+Keyset pagination helpers for the AKWAFLOW website
+
+Listings are ordered newest first on (date_created, id) and resume from an
+opaque cursor holding the last row's position, so every page costs the
+same no matter how deep it is.
+"""
+
+import base64
+
+
+def encode_cursor(date_created, row_id):
+    """Encode a (date_created, id) position as an opaque cursor"""
+    raw = f"{date_created or ''}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, or raise ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_created, row_id = raw.rsplit('|', 1)
+        return date_created, int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def seek_clause(cursor):
+    """Return the WHERE fragment and parameters that resume after a cursor"""
+    date_created, row_id = decode_cursor(cursor)
+    return ("(date_created < ? OR (date_created = ? AND id < ?))",
+            [date_created, date_created, row_id])
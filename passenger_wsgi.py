@@ -5,6 +5,11 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app import app as application
+import outbox
+
+# Deliver queued contact emails from inside each Passenger process
+if application.config['OUTBOX_WORKER']:
+    outbox.start_worker(application)
 
 if __name__ == "__main__":
     application.run()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Slow-query log for the AKWAFLOW website
+
+Statements run through the pool that take longer than SLOW_QUERY_MS are
+written as JSON lines to a rotating log, with the shape of their bound
+parameters, the route that issued them and the EXPLAIN QUERY PLAN SQLite
+chose. summarize() groups a log by statement for `manage_db.py analyze`
+and flags full-table scans and temporary sort B-trees.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+
+LOGGER_NAME = 'akwaflow.slow_queries'
+
+
+def normalize(sql):
+    return ' '.join(sql.split())
+
+
+def param_shape(params):
+    """Describe bound parameters by type without logging their values"""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def explain(conn, sql, params=()):
+    """Return EXPLAIN QUERY PLAN lines for a statement, indented by nesting, or None"""
+    try:
+        # Call the base class so the plan query itself is not counted or logged
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    except (sqlite3.Error, ValueError):
+        return None  # PRAGMA, BEGIN and the like have no plan
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+def plan_flags(plan):
+    """Name the expensive operations in a query plan"""
+    flags = []
+    for line in plan or ():
+        detail = line.strip()
+        if detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail:
+            flags.append(f"full scan: {detail[5:]}")
+        elif detail.startswith('USE TEMP B-TREE'):
+            flags.append(detail.lower())
+    return flags
+
+
+class SlowQueryLog:
+    """Writes statements slower than a threshold to a rotating JSON-lines file"""
+
+    def __init__(self, path, threshold_ms=100, max_bytes=1024 * 1024, backups=5):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.logger = logging.getLogger(f"{LOGGER_NAME}.{os.path.abspath(path)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the log from SLOW_QUERY_* settings, or return None when it is disabled"""
+        path = config.get('SLOW_QUERY_LOG')
+        if not path:
+            return None
+        return cls(path, config.get('SLOW_QUERY_MS', 100),
+                   config.get('SLOW_QUERY_LOG_BYTES', 1024 * 1024), config.get('SLOW_QUERY_LOG_BACKUPS', 5))
+
+    def record(self, conn, sql, params, seconds, many=False):
+        if many:
+            params = list(params)
+            shape = {'rows': len(params), 'row': param_shape(params[0]) if params else []}
+            plan_params = params[0] if params else ()
+        else:
+            shape = param_shape(params)
+            plan_params = params
+        plan = explain(conn, sql, plan_params)
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'ms': round(seconds * 1000, 3),
+            'sql': normalize(sql),
+            'params': shape,
+            'endpoint': request.endpoint if has_request_context() else None,
+            'route': request.url_rule.rule if has_request_context() and request.url_rule else None,
+            'pid': os.getpid(),
+            'plan': plan,
+            'flags': plan_flags(plan),
+        }
+        self.logger.info(json.dumps(entry))
+
+
+def read(path):
+    """Yield entries from a log and its rotated backups, oldest first"""
+    backups = []
+    directory = os.path.dirname(path) or '.'
+    base = os.path.basename(path)
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            suffix = name[len(base) + 1:]
+            if name.startswith(base + '.') and suffix.isdigit():
+                backups.append((int(suffix), os.path.join(directory, name)))
+    for _, filename in sorted(backups, reverse=True) + [(0, path)]:
+        if not os.path.exists(filename):
+            continue
+        with open(filename) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries):
+    """Group entries by statement, worst total time first"""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['sql'], {
+            'sql': entry['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'endpoints': set(), 'plan': None, 'flags': [], 'params': entry.get('params'),
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['max_ms'] = max(group['max_ms'], entry['ms'])
+        if entry.get('endpoint'):
+            group['endpoints'].add(entry['endpoint'])
+        group['plan'] = entry.get('plan')  # latest wins
+        group['flags'] = entry.get('flags', [])
+    return sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)
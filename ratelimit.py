@@ -0,0 +1,161 @@
+"""
+Token-bucket rate limiting for the AKWAFLOW website
+
+Each limited endpoint has a bucket per client IP and one shared by all
+clients, so a single abuser is stopped early and a distributed flood is
+shed before it saturates the workers. Buckets live in process memory by
+default. Set RATE_LIMIT_STORE to a SQLite file so that every worker
+process draws from the same buckets; gunicorn.conf.py does this itself
+when it starts more than one worker. A rejected request gets a 429 with
+Retry-After before the view runs any query or password check.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+
+def parse_rate(spec):
+    """'5/300' -> (capacity 5, refill 5 tokens per 300 seconds); empty means unlimited"""
+    if not spec:
+        return None
+    count, _, seconds = str(spec).partition('/')
+    capacity = float(count)
+    return capacity, capacity / float(seconds or 1)
+
+
+class MemoryStore:
+    """Buckets in this process, least recently used dropped beyond max_keys"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now=None):
+        """Spend one token; returns seconds until one is available, 0 if it was granted"""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file shared by every worker process on the host"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, idle_seconds=3600):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Bucket state is disposable, so durability is traded for speed
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets "
+                         "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                # A bucket untouched this long has refilled anyway
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_seconds,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class RateLimiter:
+    """Flask extension applying per-IP and global token buckets to views"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        path = app.config.get('RATE_LIMIT_STORE')
+        self.store = SQLiteStore(path) if path else MemoryStore()
+        app.extensions['rate_limiter'] = self
+
+    def check(self, name, per_ip, overall):
+        """Spend a token from each bucket; returns whole seconds to wait, or 0"""
+        checks = ((f"{name}:ip:{request.remote_addr}", 'ip', per_ip), (f"{name}:all", 'global', overall))
+        for key, scope, spec in checks:
+            rate = parse_rate(spec)
+            if rate is None:
+                continue
+            try:
+                wait = self.store.take(key, *rate)
+            except sqlite3.Error as e:
+                # Never take the site down with the limiter: fail open
+                print(f"Rate limit store unavailable: {e}")
+                return 0
+            if wait:
+                metrics = current_app.extensions.get('metrics')
+                if metrics is not None:
+                    metrics.inc('akwaflow_rate_limited_total', {'endpoint': name, 'scope': scope})
+                return max(1, math.ceil(wait))
+        return 0
+
+    def limit(self, per_ip_key, global_key, limited, methods=('POST',)):
+        """Decorator limiting a view by the rates in config[per_ip_key] and config[global_key]
+
+        limited(retry_after) builds the body of the 429 response.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.enabled and request.method in methods:
+                    config = current_app.config
+                    retry_after = self.check(request.endpoint, config.get(per_ip_key), config.get(global_key))
+                    if retry_after:
+                        response = current_app.make_response(limited(retry_after))
+                        response.status_code = 429
+                        response.headers['Retry-After'] = str(retry_after)
+                        return response
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
@@ -0,0 +1,252 @@
+"""
+Related posts for the AKWAFLOW website
+
+Every published post gets a TF-IDF vector over its title, HTML-stripped
+body and category, pruned to its strongest terms and stored in
+related_vectors. The most similar posts by cosine similarity are kept in
+related_posts, so a blog page reads its related articles with one indexed
+lookup. rebuild() recomputes everything in memory; update_post() and
+remove_post() keep the tables current as admins write, weighting terms by
+the document frequencies of the last rebuild.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+import blog
+
+TOP_K = 3                # related posts stored and shown per post
+TERMS_PER_POST = 40      # strongest terms kept in each vector
+POSTINGS_PER_TERM = 50   # heaviest posts per term a rebuild compares through
+CANDIDATES = 50          # neighbours of a changed post checked for a place in their lists
+TITLE_WEIGHT = 3
+CATEGORY_WEIGHT = 3
+DOCUMENTS_COUNTER = 'related_documents'
+
+# Correlated columns for a query FROM posts: the related posts a page shows, and when they last changed
+VERSION_COLUMNS = (
+    "(SELECT group_concat(related_id || '@' || updated_at) FROM "
+    "(SELECT r.related_id, q.updated_at FROM related_posts r JOIN posts q ON q.id = r.related_id "
+    "WHERE r.post_id = posts.id AND q.published = 1 ORDER BY r.rank)), "
+    "(SELECT MAX(q.updated_at) FROM related_posts r JOIN posts q ON q.id = r.related_id "
+    "WHERE r.post_id = posts.id AND q.published = 1)"
+)
+
+TOKEN = re.compile(r'[a-z][a-z0-9]{2,}')
+STOP_WORDS = frozenset('''
+    about above after again against all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here hers him his
+    how into its itself just more most nor not now off once only other our ours out over own same she should
+    some such than that the their theirs them then there these they this those through too under until very
+    was were what when where which while who whom why will with would you your yours
+'''.split())
+
+
+def _tokens(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def term_counts(title, text, category):
+    """Term frequencies of a post from its HTML-stripped text, with title words and the category counted extra"""
+    counts = Counter(_tokens(text or ''))
+    for term in _tokens(title or ''):
+        counts[term] += TITLE_WEIGHT
+    if category:
+        counts['category:' + category.strip().lower()] += CATEGORY_WEIGHT
+    return counts
+
+
+def _vector(counts, idf, default_idf):
+    """Unit-length TF-IDF vector of the strongest TERMS_PER_POST terms"""
+    weights = [(term, (1 + math.log(count)) * idf.get(term, default_idf)) for term, count in counts.items()]
+    weights = heapq.nlargest(TERMS_PER_POST, (w for w in weights if w[1] > 0), key=itemgetter(1))
+    norm = math.sqrt(sum(w * w for _, w in weights))
+    return {term: w / norm for term, w in weights} if norm else {}
+
+
+def _published(cursor, batch_size):
+    """Yield (id, title, text, category) for every published post, reading in id order
+
+    The stripped text comes from the search index, which holds it already.
+    """
+    last_id = 0
+    while True:
+        cursor.execute("SELECT p.id, p.title, f.body, p.category FROM posts p "
+                       "JOIN posts_fts f ON f.rowid = p.id WHERE p.published = 1 AND p.id > ? "
+                       "ORDER BY p.id LIMIT ?", (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def rebuild(conn, batch_size=500):
+    """Recompute every vector and related list, returning how many posts were indexed"""
+    indexed = rebuild_rows(conn.cursor(), batch_size)
+    conn.commit()
+    return indexed
+
+
+def rebuild_rows(cursor, batch_size=500):
+    """rebuild() without the commit"""
+    # First pass: document frequencies. Term counts are recomputed in the second
+    # pass rather than held for every post, to keep memory flat.
+    df = Counter()
+    documents = 0
+    for _, title, text, category in _published(cursor, batch_size):
+        df.update(term_counts(title, text, category).keys())
+        documents += 1
+    idf = {term: math.log((1 + documents) / (1 + n)) for term, n in df.items()}
+    del df
+
+    vectors = {}
+    for post_id, title, text, category in _published(cursor, batch_size):
+        vectors[post_id] = _vector(term_counts(title, text, category), idf, 0.0)
+
+    # Compare each post only through the heaviest postings of its terms: a
+    # post's best matches share its strong terms, and long lists of weak
+    # matches are what make all-pairs similarity slow
+    postings = defaultdict(list)
+    for post_id, vector in vectors.items():
+        for term, weight in vector.items():
+            postings[term].append((weight, post_id))
+    for term, entries in postings.items():
+        if len(entries) > POSTINGS_PER_TERM:
+            postings[term] = heapq.nlargest(POSTINGS_PER_TERM, entries)
+
+    neighbours = []
+    for post_id, vector in vectors.items():
+        scores = {}
+        get = scores.get
+        for term, weight in vector.items():
+            for other_weight, other_id in postings[term]:
+                scores[other_id] = get(other_id, 0.0) + weight * other_weight
+        scores.pop(post_id, None)
+        for rank, (other_id, score) in enumerate(heapq.nlargest(TOP_K, scores.items(), key=itemgetter(1))):
+            neighbours.append((post_id, rank, other_id, score))
+
+    cursor.execute("DELETE FROM related_terms")
+    cursor.execute("DELETE FROM related_vectors")
+    cursor.execute("DELETE FROM related_posts")
+    cursor.executemany("INSERT INTO related_terms (term, idf) VALUES (?, ?)", idf.items())
+    cursor.executemany("INSERT INTO related_vectors (term, post_id, weight) VALUES (?, ?, ?)",
+                       ((term, post_id, weight) for post_id, vector in vectors.items()
+                        for term, weight in vector.items()))
+    cursor.executemany("INSERT INTO related_posts (post_id, rank, related_id, score) VALUES (?, ?, ?, ?)",
+                       neighbours)
+    cursor.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (DOCUMENTS_COUNTER, documents))
+    return len(vectors)
+
+
+def _similar(cursor, post_id, vector, limit):
+    """[(post_id, score)] of the posts closest to vector, best first"""
+    if not vector:
+        return []
+    items = list(vector.items())
+    values = ', '.join('(?, ?)' for _ in items)
+    cursor.execute(f"WITH query (term, weight) AS (VALUES {values}) "
+                   "SELECT v.post_id, SUM(v.weight * query.weight) AS score "
+                   "FROM query JOIN related_vectors v ON v.term = query.term "
+                   "WHERE v.post_id != ? GROUP BY v.post_id ORDER BY score DESC LIMIT ?",
+                   [value for item in items for value in item] + [post_id, limit])
+    return cursor.fetchall()
+
+
+def _store(cursor, post_id, neighbours):
+    cursor.execute("DELETE FROM related_posts WHERE post_id = ?", (post_id,))
+    cursor.executemany("INSERT INTO related_posts (post_id, rank, related_id, score) VALUES (?, ?, ?, ?)",
+                       [(post_id, rank, other_id, score) for rank, (other_id, score) in enumerate(neighbours)])
+
+
+def _refresh(cursor, post_id):
+    """Recompute one post's related list from its stored vector"""
+    cursor.execute("SELECT term, weight FROM related_vectors WHERE post_id = ?", (post_id,))
+    _store(cursor, post_id, _similar(cursor, post_id, dict(cursor.fetchall()), TOP_K))
+
+
+def _listed_by(cursor, post_id):
+    cursor.execute("SELECT post_id FROM related_posts WHERE related_id = ?", (post_id,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def update_post(cursor, post_id):
+    """Re-index a post after a write, in the caller's transaction
+
+    Returns the ids of other posts whose related lists changed or show this
+    post, so their pages can be refreshed.
+    """
+    cursor.execute("SELECT title, content, category, published FROM posts WHERE id = ?", (post_id,))
+    row = cursor.fetchone()
+    if row is None or not row[3]:
+        return remove_post(cursor, post_id)
+
+    counts = term_counts(row[0], blog.strip_html(row[1] or ''), row[2])
+    terms = list(counts)
+    idf = {}
+    for start in range(0, len(terms), 500):
+        batch = terms[start:start + 500]
+        cursor.execute(f"SELECT term, idf FROM related_terms WHERE term IN ({', '.join('?' * len(batch))})", batch)
+        idf.update(cursor.fetchall())
+    # A term no post had at the last rebuild weighs as if this post had been its only document
+    cursor.execute("SELECT value FROM counters WHERE name = ?", (DOCUMENTS_COUNTER,))
+    documents = (cursor.fetchone() or (0,))[0]
+    vector = _vector(counts, idf, math.log(2 + documents))
+
+    cursor.execute("DELETE FROM related_vectors WHERE post_id = ?", (post_id,))
+    cursor.executemany("INSERT INTO related_vectors (term, post_id, weight) VALUES (?, ?, ?)",
+                       [(term, post_id, weight) for term, weight in vector.items()])
+    candidates = _similar(cursor, post_id, vector, max(TOP_K, CANDIDATES))
+    _store(cursor, post_id, candidates[:TOP_K])
+
+    # Similarity is symmetric, so each neighbour's score for this post is already known:
+    # offer it to their lists instead of recomputing them
+    scores = dict(candidates)
+    listed = _listed_by(cursor, post_id)
+    affected = set(listed)
+    for other_id in listed - scores.keys():
+        _refresh(cursor, other_id)  # no longer close enough to be a candidate
+    for other_id, score in candidates:
+        if _offer(cursor, other_id, post_id, score):
+            affected.add(other_id)
+    return affected
+
+
+def _offer(cursor, post_id, candidate_id, score):
+    """Put candidate_id in post_id's list if it now ranks there; returns True if the list changed"""
+    cursor.execute("SELECT related_id, score FROM related_posts WHERE post_id = ?", (post_id,))
+    entries = dict(cursor.fetchall())
+    previous = entries.get(candidate_id)
+    if previous is not None and score < previous:
+        # It dropped: a post outside the list may now outrank it
+        _refresh(cursor, post_id)
+        return True
+    entries[candidate_id] = score
+    best = heapq.nlargest(TOP_K, entries.items(), key=itemgetter(1))
+    if previous is None and candidate_id not in dict(best):
+        return False
+    _store(cursor, post_id, best)
+    return True
+
+
+def remove_post(cursor, post_id):
+    """Drop a deleted or unpublished post, refilling the lists that showed it; returns their ids"""
+    affected = _listed_by(cursor, post_id)
+    cursor.execute("DELETE FROM related_vectors WHERE post_id = ?", (post_id,))
+    cursor.execute("DELETE FROM related_posts WHERE post_id = ? OR related_id = ?", (post_id, post_id))
+    for other_id in affected:
+        _refresh(cursor, other_id)
+    return affected
+
+
+def fetch(cursor, post_id, limit=TOP_K):
+    """Card fields of a post's related posts, most similar first"""
+    cursor.execute("SELECT p.id, p.slug, p.title, p.excerpt, p.category, p.image, p.date_created, p.read_time "
+                   "FROM related_posts r JOIN posts p ON p.id = r.related_id "
+                   "WHERE r.post_id = ? AND p.published = 1 ORDER BY r.rank LIMIT ?", (post_id, limit))
+    return [{'id': row[0], 'slug': row[1], 'title': row[2], 'description': row[3] or '',
+             'category': row[4] or 'General', 'image': row[5], 'date': (row[6] or '')[:10],
+             'read_time': blog.format_read_time(row[7])} for row in cursor.fetchall()]
@@ -4,44 +4,132 @@ AKWAFLOW Website Startup Script
 """
 
 import os
+import shutil
+import signal
 import sys
-from app import app, init_db, create_upload_folder
+import time
+from app import app, bootstrap
+import outbox
+import assets
+import freeze
 
 def setup_environment():
     """Setup the environment for the application"""
     print("Setting up AKWAFLOW website...")
     
-    # Initialize database
-    print("Initializing database...")
-    init_db()
+    # Apply pending migrations and create the upload folder
+    print("Initializing database and upload folder...")
+    bootstrap()
     
-    # Create upload folder
-    print("Creating upload folder...")
-    create_upload_folder()
+    # Fingerprint and precompress static files (only changed files are rebuilt)
+    build_assets()
     
     print("Setup complete!")
 
+def build_assets(clean=False):
+    """Build fingerprinted static assets and load the new manifest"""
+    print("Building static assets...")
+    manifest = assets.build(app.static_folder, clean=clean)
+    app.extensions['assets'].load()
+    print(f"Fingerprinted {len(manifest)} static files")
+
+def freeze_pages(force=False):
+    """Render public pages to static files, re-rendering only those that changed"""
+    print("Freezing public pages...")
+    freezer = app.extensions['freezer']
+    expected = os.path.join(app.root_path, freeze.HTACCESS_DIR)
+    if freezer.directory and os.path.realpath(freezer.directory) != os.path.realpath(expected):
+        print(f"Warning: FREEZE_DIR is {freezer.directory} but .htaccess serves {expected}; "
+              "update its rewrite rules or Apache will keep sending these pages to Python")
+    rendered, removed, unchanged = freezer.freeze(force=force)
+    print(f"Rendered {rendered} pages, removed {removed}, {unchanged} unchanged")
+
 def run_development():
     """Run the application in development mode"""
     setup_environment()
     print("Starting AKWAFLOW website in development mode...")
     print("Access the website at: http://localhost:5000")
     print("Admin panel at: http://localhost:5000/admin")
-    print("Default admin credentials: admin / admin123")
+    print("Admin credentials: ADMIN_USERNAME / ADMIN_PASSWORD from the environment")
     print("\nPress Ctrl+C to stop the server")
     
+    # With the reloader active only the serving child delivers email
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        outbox.start_worker(app)
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
 
 def run_production():
-    """Run the application in production mode"""
+    """Run the application under gunicorn with the settings in gunicorn.conf.py"""
     setup_environment()
+    # The console script, not `python -m gunicorn`: a reload re-executes the
+    # master's argv, and running gunicorn/__main__.py as a script would shadow
+    # the standard library's http package with gunicorn's own
+    executable = shutil.which('gunicorn', path=os.pathsep.join([os.path.dirname(sys.executable),
+                                                                os.environ.get('PATH', '')]))
+    if executable is None:
+        # gunicorn does not run on Windows; fall back to the threaded Werkzeug server
+        print("gunicorn is not installed; starting the single-process server instead")
+        if app.config['OUTBOX_WORKER']:
+            outbox.start_worker(app)
+        app.run(debug=False, host='0.0.0.0', port=app.config['PORT'], threaded=True)
+        return
+
     print("Starting AKWAFLOW website in production mode...")
-    app.run(debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    # Replace this process so the gunicorn master receives signals directly
+    os.execv(executable, [executable, '--config', config, 'app:app'])
+
+def reload_production(timeout=60):
+    """Start workers running the current code and gracefully retire the old ones"""
+    pidfile = app.config['WEB_PIDFILE']
+    if not pidfile or not os.path.exists(pidfile):
+        print("No running server found (WEB_PIDFILE is not set or missing)")
+        return
+    with open(pidfile) as f:
+        old = int(f.read().strip())
+
+    # USR2 starts a new master on the same sockets that loads the code afresh
+    # (a preloaded app ignores HUP). It writes <pidfile>.2 once the app has
+    # imported, and takes over the pidfile when the old master exits.
+    os.kill(old, signal.SIGUSR2)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(0.5)
+        try:
+            with open(pidfile + '.2') as f:
+                new = f.read().strip()
+        except FileNotFoundError:
+            continue
+        if new:
+            # TERM lets the old workers finish their requests before exiting
+            os.kill(old, signal.SIGTERM)
+            print(f"Reloaded: server {new} replaced {old}")
+            return
+    print(f"The new server did not start within {timeout}s; {old} is still serving")
+
+def run_worker():
+    """Run the email outbox worker as its own process"""
+    setup_environment()
+    print("Starting AKWAFLOW outbox worker...")
+    print("\nPress Ctrl+C to stop the worker")
+    try:
+        outbox.OutboxWorker(app).run()
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     mode = sys.argv[1] if len(sys.argv) > 1 else 'dev'
     
     if mode == 'prod':
         run_production()
+    elif mode == 'reload':
+        reload_production()
+    elif mode == 'worker':
+        run_worker()
+    elif mode == 'assets':
+        build_assets(clean='--clean' in sys.argv[2:])
+    elif mode == 'freeze':
+        freeze_pages(force='--force' in sys.argv[2:])
     else:
         run_development()
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Versioned schema migrations for the AKWAFLOW website
+
+Each change to the database lives in migrations/ as NNNN_description.py
+with an upgrade(cursor) function. PRAGMA user_version records the last
+migration applied; migrate() runs the remaining ones in order, each in its
+own write transaction together with the version bump, so a failed
+migration leaves the database exactly at the previous version.
+
+Migrations never import application modules: each carries its own copy of
+the DDL and of any code its data steps need, so later changes to the app
+cannot change what an old migration does.
+"""
+
+import importlib.util
+import os
+import re
+import sqlite3
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+FILENAME = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+
+class MigrationError(Exception):
+    """Raised when the migration scripts are inconsistent or one of them fails"""
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path)] for every migration script, in order"""
+    found = []
+    for filename in os.listdir(directory):
+        match = FILENAME.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    found.sort()
+
+    # Versions must run 1..N without gaps or duplicates
+    for expected, (version, name, _) in enumerate(found, start=1):
+        if version != expected:
+            raise MigrationError(f"Expected migration {expected:04d}, found {version:04d}_{name}")
+    return found
+
+
+def latest_version(directory=MIGRATIONS_DIR):
+    return len(discover(directory))
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def is_current(database, directory=MIGRATIONS_DIR):
+    """Cheap startup check: True when the database exists and has every migration applied"""
+    if not os.path.exists(database):
+        return False
+    # A bare connection: no pragmas, no writes, just the header field
+    conn = sqlite3.connect(database)
+    try:
+        return current_version(conn) >= latest_version(directory)
+    finally:
+        conn.close()
+
+
+def pending(conn, directory=MIGRATIONS_DIR):
+    """Migrations not yet applied to this database"""
+    version = current_version(conn)
+    return [m for m in discover(directory) if m[0] > version]
+
+
+def _load(version, name, path):
+    spec = importlib.util.spec_from_file_location(f"migration_{version:04d}_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, 'upgrade'):
+        raise MigrationError(f"Migration {version:04d}_{name} has no upgrade(cursor)")
+    return module
+
+
+def migrate(conn, target=None, directory=MIGRATIONS_DIR, verbose=True):
+    """Apply pending migrations up to target (default: all), returning their names"""
+    migrations = discover(directory)
+    latest = len(migrations)
+    target = latest if target is None else target
+    if not 0 <= target <= latest:
+        raise MigrationError(f"Unknown target version {target}, latest is {latest}")
+
+    version = current_version(conn)
+    if version > latest:
+        # Code older than the database, e.g. mid-way through a rolling deploy
+        print(f"Database schema version {version} is newer than this code ({latest}); not migrating")
+        return []
+    if version > target:
+        raise MigrationError(f"Database is at version {version}; downgrading to {target} is not supported")
+
+    if conn.in_transaction:
+        conn.commit()
+    applied = []
+    for number, name, path in migrations[version:target]:
+        module = _load(number, name, path)
+        cursor = conn.cursor()
+        # IMMEDIATE takes the write lock up front; another process may have
+        # applied this migration while we waited for it
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= number:
+                conn.rollback()
+                continue
+            module.upgrade(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise MigrationError(f"Migration {number:04d}_{name} failed: {e}") from e
+        applied.append(f"{number:04d}_{name}")
+        if verbose:
+            print(f"Applied migration {number:04d}_{name}")
+    return applied
+
+
+def status(conn, directory=MIGRATIONS_DIR):
+    """Return (current version, latest version, names of pending migrations)"""
+    migrations = discover(directory)
+    version = current_version(conn)
+    names = [f"{number:04d}_{name}" for number, name, _ in migrations if number > version]
+    return version, len(migrations), names
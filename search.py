@@ -0,0 +1,138 @@
+"""
+Full-text search over blog posts for the AKWAFLOW website
+
+Posts are indexed in an FTS5 table keyed by post id, holding the title,
+the HTML-stripped body and the category. The admin write paths keep it in
+sync; rebuild() recreates it from the posts table.
+"""
+
+import html
+import re
+
+import blog
+
+# Private-use markers around matches, swapped for <mark> after escaping
+MARK_OPEN = '\ue000'
+MARK_CLOSE = '\ue001'
+
+
+def index_post(cursor, post_id, title, content, category):
+    """Add or replace a post in the search index"""
+    cursor.execute("DELETE FROM posts_fts WHERE rowid = ?", (post_id,))
+    cursor.execute("INSERT INTO posts_fts (rowid, title, body, category) VALUES (?, ?, ?, ?)",
+                   (post_id, title, blog.strip_html(content), category or ''))
+
+
+def remove_post(cursor, post_id):
+    """Drop a post from the search index"""
+    cursor.execute("DELETE FROM posts_fts WHERE rowid = ?", (post_id,))
+
+
+def remove_posts(cursor, post_ids):
+    """Drop several posts from the search index"""
+    cursor.executemany("DELETE FROM posts_fts WHERE rowid = ?", [(post_id,) for post_id in post_ids])
+
+
+def rebuild(conn, batch_size=500):
+    """Re-index every post, returning how many were indexed"""
+    indexed = reindex(conn.cursor(), batch_size)
+    conn.commit()
+    return indexed
+
+
+def reindex(cursor, batch_size=500):
+    """rebuild() without the commit"""
+    cursor.execute("DELETE FROM posts_fts")
+
+    # Read in id order a batch at a time to keep memory flat
+    indexed = 0
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, title, content, category FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                       (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany("INSERT INTO posts_fts (rowid, title, body, category) VALUES (?, ?, ?, ?)",
+                           [(post_id, title, blog.strip_html(content), category or '')
+                            for post_id, title, content, category in rows])
+        indexed += len(rows)
+        last_id = rows[-1][0]
+
+    # Merge the index b-trees so queries touch as few pages as possible
+    cursor.execute("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+    return indexed
+
+
+def needs_rebuild(cursor):
+    """True when posts exist but nothing has been indexed yet"""
+    cursor.execute("SELECT 1 FROM posts_fts LIMIT 1")
+    if cursor.fetchone() is not None:
+        return False
+    cursor.execute("SELECT 1 FROM posts LIMIT 1")
+    return cursor.fetchone() is not None
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query (all terms, last one as a prefix)"""
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def render_marked(text):
+    """Escape indexed text and turn match markers into <mark> tags"""
+    escaped = html.escape(text or '')
+    return escaped.replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+
+def search_posts(cursor, text, limit=10, offset=0, category=None):
+    """Return (results, has_more) for published posts matching the text
+
+    The page is ranked and cut inside the FTS index alone; posts rows are
+    read and highlight/snippet run only for the rows on it.
+    """
+    query = build_match_query(text)
+    if query is None:
+        return [], False
+
+    # Drafts are few, so excluding them through the published index is cheaper than joining posts;
+    # a category filter takes its published ids straight from the category index instead
+    # (+rowid keeps FTS5 from re-running the query for each of those ids).
+    # ORDER BY +rank keeps the sort in SQLite, whose top-N sorter beats FTS5 sorting every match.
+    if category:
+        scope = "+rowid IN (SELECT id FROM posts WHERE category = ? AND published = 1)"
+        params = [query, category]
+    else:
+        scope = "rowid NOT IN (SELECT id FROM posts WHERE published = 0)"
+        params = [query]
+    cursor.execute(f"SELECT rowid FROM posts_fts WHERE posts_fts MATCH ? AND {scope} ORDER BY +rank LIMIT ? OFFSET ?",
+                   params + [limit + 1, offset])
+    ids = [row[0] for row in cursor.fetchall()]
+    page = ids[:limit]
+    if not page:
+        return [], False
+
+    # +rowid stops FTS5 re-running the query once per id, which is slow for prefix terms
+    cursor.execute(
+        "SELECT p.id, p.slug, highlight(posts_fts, 0, ?, ?), "
+        "snippet(posts_fts, 1, ?, ?, '...', 24), p.category, p.image, p.date_created "
+        "FROM posts_fts JOIN posts p ON p.id = posts_fts.rowid "
+        f"WHERE posts_fts MATCH ? AND +posts_fts.rowid IN ({', '.join('?' * len(page))})",
+        [MARK_OPEN, MARK_CLOSE, MARK_OPEN, MARK_CLOSE, query] + page)
+    position = {post_id: i for i, post_id in enumerate(page)}
+    rows = sorted(cursor.fetchall(), key=lambda row: position[row[0]])
+
+    results = [{
+        'id': post_id,
+        'slug': slug,
+        'title': render_marked(title),
+        'snippet': render_marked(snippet),
+        'category': post_category or 'General',
+        'image': image or 'flows.jpg',
+        'date': date_created[:10] if date_created else '2024-01-01',
+    } for post_id, slug, title, snippet, post_category, image, date_created in rows]
+    return results, len(ids) > limit
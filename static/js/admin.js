@@ -0,0 +1,46 @@
+// Bulk action forms on the admin lists
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('form[data-bulk]').forEach(function(form) {
+        const selectAll = form.querySelector('[data-select-all]');
+        const boxes = form.querySelectorAll('input[name="ids"]');
+        const selectedCount = form.querySelector('[data-selected-count]');
+
+        function update() {
+            const checked = form.querySelectorAll('input[name="ids"]:checked').length;
+            selectAll.checked = boxes.length > 0 && checked === boxes.length;
+            selectAll.indeterminate = checked > 0 && checked < boxes.length;
+            if (selectedCount) {
+                selectedCount.textContent = `${checked} selected`;
+            }
+        }
+
+        selectAll.addEventListener('change', function() {
+            boxes.forEach(function(box) {
+                box.checked = selectAll.checked;
+            });
+            update();
+        });
+        boxes.forEach(function(box) {
+            box.addEventListener('change', update);
+        });
+
+        form.addEventListener('submit', function(e) {
+            const action = form.elements.action;
+            const scope = e.submitter ? e.submitter.value : 'selected';
+            if (scope !== 'matching' && !form.querySelector('input[name="ids"]:checked')) {
+                e.preventDefault();
+                alert('Select at least one item first.');
+                return;
+            }
+            const target = scope === 'matching'
+                ? 'every message matching the current filters'
+                : `${form.querySelectorAll('input[name="ids"]:checked').length} selected item(s)`;
+            if ((action.value === 'delete' || scope === 'matching')
+                    && !confirm(`${action.options[action.selectedIndex].text}: ${target}?`)) {
+                e.preventDefault();
+            }
+        });
+
+        update();
+    });
+});
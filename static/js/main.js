@@ -31,34 +31,31 @@ document.addEventListener('DOMContentLoaded', function() {
     initNavbarScroll();
 });
 
+const BLOG_PAGE_SIZE = 6;
+
 function loadBlogPosts() {
     const blogContainer = document.getElementById('blogContainer');
     if (!blogContainer) return;
 
-    fetch('/api/blogs')
+    // The first page comes inline with the HTML; only later pages are fetched
+    const bootstrap = document.getElementById('blogBootstrap');
+    if (bootstrap) {
+        let data;
+        try {
+            data = JSON.parse(bootstrap.textContent);
+        } catch (error) {
+            data = null;
+        }
+        if (data) {
+            renderBlogPage(blogContainer, data, true);
+            return;
+        }
+    }
+
+    // Revalidate with the stored ETag; an unchanged list comes back as a bodiless 304
+    fetch(`/api/blogs?limit=${BLOG_PAGE_SIZE}`, { cache: 'no-cache' })
         .then(response => response.json())
-        .then(posts => {
-            const postEntries = Object.entries(posts).slice(0, 6);
-            
-            if (postEntries.length === 0) {
-                blogContainer.innerHTML = `
-                    <div class="col-span-full text-center py-12">
-                        <div class="text-gray-400 mb-4">
-                            <svg class="w-16 h-16 mx-auto" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M19 20H5a2 2 0 01-2-2V6a2 2 0 012-2h10a2 2 0 012 2v1m2 13a2 2 0 01-2-2V7m2 13a2 2 0 002-2V9a2 2 0 00-2-2h-2m-4-3H9M7 16h6M7 8h6v4H7V8z"></path>
-                            </svg>
-                        </div>
-                        <h3 class="text-xl font-semibold text-gray-600 mb-2">No blog posts yet</h3>
-                        <p class="text-gray-500">Check back soon for our latest insights and updates.</p>
-                    </div>
-                `;
-                return;
-            }
-            
-            blogContainer.innerHTML = postEntries.map(([slug, post]) => 
-                createBlogCard(slug, post)
-            ).join('');
-        })
+        .then(data => renderBlogPage(blogContainer, data, true))
         .catch(error => {
             console.error('Error loading blog posts:', error);
             blogContainer.innerHTML = `
@@ -75,6 +72,52 @@ function loadBlogPosts() {
         });
 }
 
+function renderBlogPage(blogContainer, data, first) {
+    const posts = data.posts || [];
+
+    if (first && posts.length === 0) {
+        blogContainer.innerHTML = `
+            <div class="col-span-full text-center py-12">
+                <div class="text-gray-400 mb-4">
+                    <svg class="w-16 h-16 mx-auto" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M19 20H5a2 2 0 01-2-2V6a2 2 0 012-2h10a2 2 0 012 2v1m2 13a2 2 0 01-2-2V7m2 13a2 2 0 002-2V9a2 2 0 00-2-2h-2m-4-3H9M7 16h6M7 8h6v4H7V8z"></path>
+                    </svg>
+                </div>
+                <h3 class="text-xl font-semibold text-gray-600 mb-2">No blog posts yet</h3>
+                <p class="text-gray-500">Check back soon for our latest insights and updates.</p>
+            </div>
+        `;
+        return;
+    }
+
+    const cards = posts.map(post => createBlogCard(post.slug, post)).join('');
+    if (first) {
+        blogContainer.innerHTML = cards;
+    } else {
+        blogContainer.insertAdjacentHTML('beforeend', cards);
+    }
+
+    if (data.has_more && data.next_cursor) {
+        watchForMorePosts(blogContainer, data.next_cursor);
+    }
+}
+
+function watchForMorePosts(blogContainer, nextCursor) {
+    const sentinel = document.getElementById('blogSentinel');
+    if (!sentinel || !('IntersectionObserver' in window)) return;
+
+    // Fetch the next page once the end of the list is about to scroll into view
+    const observer = new IntersectionObserver(entries => {
+        if (!entries.some(entry => entry.isIntersecting)) return;
+        observer.disconnect();
+        fetch(`/api/blogs?limit=${BLOG_PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`)
+            .then(response => response.json())
+            .then(data => renderBlogPage(blogContainer, data, false))
+            .catch(error => console.error('Error loading more blog posts:', error));
+    }, { rootMargin: '400px 0px' });
+    observer.observe(sentinel);
+}
+
 function createBlogCard(slug, post) {
     const categoryColors = {
         'Engineering': 'bg-blue-600',
@@ -90,6 +133,8 @@ function createBlogCard(slug, post) {
         (post.image.startsWith('/') || post.image.startsWith('http') ? post.image : 
          (post.image.includes('uploads/') ? `static/${post.image}` : `static/img/${post.image}`)) : 
         'static/img/flows.jpg';
+    // An all-digit slug would be routed as a post id
+    const postUrl = slug && !/^\d+$/.test(slug) ? `/blog/${slug}` : `/blog/${post.id}`;
     
     return `
         <article class="bg-white rounded-xl shadow-md overflow-hidden hover:shadow-xl transition-shadow duration-300">
@@ -106,12 +151,12 @@ function createBlogCard(slug, post) {
                     <span>${post.read_time}</span>
                 </div>
                 <h3 class="text-xl font-bold text-gray-900 mb-3 hover:text-blue-600 transition-colors">
-                    <a href="/blog/${post.id}">${post.title}</a>
+                    <a href="${postUrl}">${post.title}</a>
                 </h3>
                 <p class="text-gray-600 mb-4 line-clamp-3">
                     ${post.description}
                 </p>
-                <a href="/blog/${post.id}" class="inline-flex items-center text-blue-600 font-semibold hover:text-blue-700 transition-colors">
+                <a href="${postUrl}" class="inline-flex items-center text-blue-600 font-semibold hover:text-blue-700 transition-colors">
                     Read More
                     <svg class="w-4 h-4 ml-2" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                         <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 5l7 7-7 7"></path>
@@ -0,0 +1,131 @@
+"""
+Content-addressed upload storage for the AKWAFLOW website
+
+Uploaded files are streamed to disk in chunks while being hashed and are
+stored as <sha256 prefix>.<ext>, so the same image uploaded for several
+posts is kept once and its URL never changes meaning. The uploads table
+counts how many posts reference each file; files nobody references are
+garbage-collected together with their derivatives.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+import images
+
+CHUNK_SIZE = 64 * 1024
+HASH_LENGTH = 32  # hex characters of the SHA-256 digest kept in the filename
+GC_GRACE_SECONDS = 600  # leave fresh uploads alone while their post is being saved
+
+# Matches content-addressed filenames and the derivatives generated from them
+HASHED_NAME = re.compile(r'^(uploads|derived)/[0-9a-f]{%d}[-.]' % HASH_LENGTH)
+
+
+def store(cursor, file, upload_folder, static_folder):
+    """Stream an uploaded file into content-addressed storage and return its filename"""
+    os.makedirs(upload_folder, exist_ok=True)
+    ext = os.path.splitext(file.filename)[1].lower()
+    if ext == '.jpeg':
+        ext = '.jpg'
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=upload_folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        filename = digest.hexdigest()[:HASH_LENGTH] + ext
+        dest = os.path.join(upload_folder, filename)
+        if os.path.exists(dest):
+            os.remove(tmp)  # Already stored: deduplicated
+        else:
+            os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    # Resize before the first write: the INSERT takes the database write lock,
+    # and other writers should not wait on Pillow
+    path = 'uploads/' + filename
+    dimensions = images.generate(static_folder, path) if images.lookup(cursor, path) is None else None
+
+    cursor.execute("INSERT INTO uploads (filename, size, uploaded_at) VALUES (?, ?, ?) "
+                   "ON CONFLICT(filename) DO UPDATE SET uploaded_at = excluded.uploaded_at",
+                   (filename, size, time.time()))
+    if dimensions is not None:
+        images.record(cursor, path, *dimensions)
+    return filename
+
+
+def is_upload(upload_folder, filename):
+    return bool(filename) and '/' not in filename and os.path.exists(os.path.join(upload_folder, filename))
+
+
+def retain(cursor, upload_folder, filename):
+    """Count a post reference to an uploaded file"""
+    if not is_upload(upload_folder, filename):
+        return
+    size = os.path.getsize(os.path.join(upload_folder, filename))
+    cursor.execute("INSERT INTO uploads (filename, size, refcount, uploaded_at) VALUES (?, ?, 1, ?) "
+                   "ON CONFLICT(filename) DO UPDATE SET refcount = refcount + 1",
+                   (filename, size, time.time()))
+
+
+def release(cursor, filename):
+    """Drop a post reference to an uploaded file"""
+    if filename:
+        cursor.execute("UPDATE uploads SET refcount = MAX(refcount - 1, 0) WHERE filename = ?", (filename,))
+
+
+def collect(conn, upload_folder, static_folder, filenames=None):
+    """Delete unreferenced uploads (optionally only among filenames) and return their names
+
+    Run after the transaction that released the references has committed.
+    """
+    cursor = conn.cursor()
+    cutoff = time.time() - GC_GRACE_SECONDS
+    if filenames is None:
+        cursor.execute("SELECT filename FROM uploads WHERE refcount = 0 AND uploaded_at < ?", (cutoff,))
+    else:
+        names = [f for f in filenames if f]
+        if not names:
+            return []
+        cursor.execute(f"SELECT filename FROM uploads WHERE refcount = 0 AND uploaded_at < ? "
+                       f"AND filename IN ({', '.join('?' * len(names))})", [cutoff] + names)
+    orphans = [row[0] for row in cursor.fetchall()]
+
+    for filename in orphans:
+        cursor.execute("DELETE FROM uploads WHERE filename = ? AND refcount = 0", (filename,))
+        images.remove(cursor, static_folder, 'uploads/' + filename)
+        try:
+            os.remove(os.path.join(upload_folder, filename))
+        except FileNotFoundError:
+            pass
+    conn.commit()
+    return orphans
+
+
+def recount(conn, upload_folder):
+    """Rebuild reference counts from the posts table for every file in the upload folder"""
+    c = conn.cursor()
+    on_disk = set()
+    if os.path.isdir(upload_folder):
+        on_disk = {f for f in os.listdir(upload_folder) if not f.endswith('.part')}
+
+    c.execute("SELECT filename FROM uploads")
+    for (filename,) in c.fetchall():
+        if filename not in on_disk:
+            c.execute("DELETE FROM uploads WHERE filename = ?", (filename,))
+    for filename in on_disk:
+        c.execute("INSERT OR IGNORE INTO uploads (filename, size, uploaded_at) VALUES (?, ?, ?)",
+                  (filename, os.path.getsize(os.path.join(upload_folder, filename)), time.time()))
+    c.execute("UPDATE uploads SET refcount = (SELECT COUNT(*) FROM posts WHERE posts.image = uploads.filename)")
+    conn.commit()
+    return len(on_disk)